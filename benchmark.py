@@ -0,0 +1,569 @@
+"""
+Benchmarks for the data paths of Universal Email Sender.
+Each benchmark generates its own synthetic input in a temporary folder and
+compares the current implementation against the code path it replaced.
+Usage:
+    python benchmark.py excel [--rows 500000]
+    python benchmark.py word [--rows 20000]
+    python benchmark.py table [--rows 1000000]   (runs at rows/100, rows/10 and rows)
+    python benchmark.py search [--rows 1000000]
+    python benchmark.py sort [--rows 1000000]
+    python benchmark.py recipients [--rows 1000000]
+    python benchmark.py render [--rows 100000]
+    python benchmark.py placeholders [--rows 20000]   (template of rows paragraphs)
+    python benchmark.py mapping [--rows 300]   (rows columns and rows placeholders)
+    python benchmark.py formatting [--rows 2000]   (cells of 40 lines, 10 to 300 rules)
+    python benchmark.py format-cache [--rows 100000]
+    python benchmark.py stream [--rows 100000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mail_merge_sender import FileImporter
+def measure(label, func, *args, **kwargs):
+    """Run func once for wall time and once under tracemalloc for peak memory"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<38} {elapsed:>8.2f} s   peak {peak / (1024 * 1024):>8.1f} MB")
+    return result, elapsed, peak
+def write_workbook(path, rows):
+    """Write a recipient-style workbook with two sheets using openpyxl's write-only mode"""
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Recipients')
+    sheet.append(['First Name', 'Last Name', 'Email', 'Country', 'Department', 'Amount'])
+    countries = ['US', 'DE', 'FR', 'UK', 'PL', 'ES']
+    departments = ['Sales', 'Support', 'Finance', 'IT']
+    for i in range(rows):
+        sheet.append([f'First{i}', f'Last{i % 5000}', f'user{i}@example.com',
+                      countries[i % len(countries)], departments[i % len(departments)], i * 1.25])
+    other = workbook.create_sheet('Archive')
+    other.append(['Email'])
+    for i in range(rows // 10):
+        other.append([f'old{i}@example.com'])
+    workbook.save(path)
+def legacy_read_excel(path):
+    """The pandas path FileImporter.read_excel_file used before streaming"""
+    import pandas as pd
+    df = pd.read_excel(path, engine='openpyxl')
+    return df.values.tolist()
+def bench_excel(rows):
+    print(f"\nExcel import, {rows:,} rows")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'recipients.xlsx')
+        start = time.perf_counter()
+        write_workbook(path, rows)
+        print(f"  (workbook written in {time.perf_counter() - start:.1f} s, {os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+        measure("list sheets", FileImporter.list_excel_sheets, path)
+        legacy, legacy_time, legacy_peak = measure("pandas read_excel + tolist (old)", legacy_read_excel, path)
+        del legacy
+        result, stream_time, stream_peak = measure("read-only streaming (new)", FileImporter.read_excel_file, path)
+        assert result['success'], result['message']
+        print(f"  time ratio {legacy_time / stream_time:.2f}x, peak memory ratio {legacy_peak / stream_peak:.2f}x, "
+              f"{len(result['data']):,} rows imported")
+def write_word_document(path, rows):
+    """Write a .docx with a recipient table, including merged cells, by generating document.xml directly"""
+    import zipfile
+    import docx
+    from xml.sax.saxutils import escape
+    template = os.path.join(os.path.dirname(path), 'template.docx')
+    docx.Document().save(template)
+    def cell(text, properties=''):
+        return f'<w:tc><w:tcPr><w:tcW w:w="2000" w:type="dxa"/>{properties}</w:tcPr><w:p><w:r><w:t>{escape(text)}</w:t></w:r></w:p></w:tc>'
+    body = ['<w:p><w:r><w:t>Recipients</w:t></w:r></w:p><w:tbl><w:tblGrid>' + '<w:gridCol w:w="2000"/>' * 5 + '</w:tblGrid>']
+    body.append('<w:tr>' + ''.join(cell(h) for h in ['First Name', 'Last Name', 'Email', 'Country', 'Department']) + '</w:tr>')
+    for i in range(rows):
+        if i % 100 == 1:
+            department = cell('', '<w:vMerge/>')
+        else:
+            department = cell(['Sales', 'Support', 'Finance', 'IT'][i % 4], '<w:vMerge w:val="restart"/>' if i % 100 == 0 else '')
+        if i % 50 == 0:
+            names = cell(f'First{i} Last{i}', '<w:gridSpan w:val="2"/>')
+        else:
+            names = cell(f'First{i}') + cell(f'Last{i % 5000}')
+        body.append(f'<w:tr>{names}{cell(f"user{i}@example.com")}{cell(["US", "DE", "FR", "UK"][i % 4])}{department}</w:tr>')
+    body.append('</w:tbl><w:p/>')
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == 'word/document.xml':
+                text = data.decode('utf-8')
+                start = text.index('<w:body>') + len('<w:body>')
+                data = (text[:start] + ''.join(body) + text[text.index('<w:sectPr'):]).encode('utf-8')
+            target.writestr(item, data)
+def legacy_read_word(path):
+    """The python-docx path FileImporter.read_word_file used before the direct XML reader"""
+    import docx
+    doc = docx.Document(path)
+    tables_data = []
+    for table in doc.tables:
+        table_data = []
+        headers = []
+        for i, row in enumerate(table.rows):
+            row_data = [cell.text.strip() for cell in row.cells]
+            if i == 0:
+                headers = row_data
+            else:
+                table_data.append(row_data)
+        if headers and table_data:
+            tables_data.append({'headers': headers, 'data': table_data})
+    return tables_data
+def bench_word(rows):
+    print(f"\nWord table import, {rows:,} rows")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'recipients.docx')
+        write_word_document(path, rows)
+        print(f"  (document written, {os.path.getsize(path) / (1024 * 1024):.1f} MB)")
+        measure("list tables", FileImporter.list_word_tables, path)
+        legacy, legacy_time, legacy_peak = measure("python-docx cell.text (old)", legacy_read_word, path)
+        result, stream_time, stream_peak = measure("expat stream of document.xml (new)", FileImporter.read_word_file, path)
+        assert result['success'], result['message']
+        assert list(result['data']) == legacy[0]['data'], "imported rows differ from python-docx"
+        print(f"  time ratio {legacy_time / stream_time:.2f}x, peak memory ratio {legacy_peak / stream_peak:.2f}x, "
+              f"{len(result['data']):,} rows imported")
+LEGACY_TABLE_ROWS = 1000
+def recipient_dataset(rows):
+    from dataset import Dataset
+    countries = ['US', 'DE', 'FR', 'UK', 'PL', 'ES']
+    dataset = Dataset.from_rows(['First Name', 'Last Name', 'Email', 'Country', 'Amount'], (
+        [f'First{i}', f'Last{i % 5000}', f'user{i}@example.com', countries[i % len(countries)], i % 997]
+        for i in range(rows)
+    ))
+    dataset.finalize()
+    return dataset
+def legacy_row_index(dataset, data_row):
+    """How the data table mapped a displayed row back to its index before rows carried ids"""
+    for idx, imported_row in enumerate(dataset):
+        if len(imported_row) == len(data_row) and all(str(a) == str(b) for a, b in zip(imported_row, data_row)):
+            return idx
+    return -1
+def legacy_select_all(view):
+    return {legacy_row_index(view.dataset, data_row) for data_row in view}
+def bench_table(rows):
+    from PyQt5.QtWidgets import QApplication
+    from mail_merge_sender import UniversalSender
+    app = QApplication.instance() or QApplication(sys.argv)
+    def no_outlook():
+        raise RuntimeError("benchmark runs without Outlook")
+    window = UniversalSender(outlook_factory=no_outlook)
+    if window.account_worker is not None:
+        # Drop the account discovery result (and its warning box) so events can be processed below
+        window.account_worker.accounts_ready.disconnect()
+        window.account_worker.wait()
+    sample = recipient_dataset(LEGACY_TABLE_ROWS)
+    start = time.perf_counter()
+    legacy = legacy_select_all(sample.view())
+    legacy_time = time.perf_counter() - start
+    assert legacy == set(range(LEGACY_TABLE_ROWS))
+    print(f"\nData table, cell-by-cell row matching (old): select all of {LEGACY_TABLE_ROWS:,} rows "
+          f"{legacy_time:.2f} s, O(n^2)")
+    for size in (rows // 100, rows // 10, rows):
+        if size < 1:
+            continue
+        dataset = recipient_dataset(size)
+        print(f"\nData table, {size:,} rows (old select all estimated at "
+              f"{legacy_time * (size / LEGACY_TABLE_ROWS) ** 2:,.0f} s)")
+        window.search_input.blockSignals(True)
+        window.search_input.clear()
+        window.search_input.blockSignals(False)
+        window.imported_data = dataset
+        window.headers = dataset.headers
+        window.selected_rows.clear()
+        def display():
+            window.filtered_data = dataset.view()
+            window.update_table_display()
+        def select_all():
+            window.select_all_rows()
+            assert len(window.selected_rows) == len(window.filtered_data)
+        def type_text(text):
+            window.search_input.setText(text)
+        def search(text):
+            window.search_input.setText(text)
+            window.filter_table_data()
+            while window.filter_worker is not None:
+                window.filter_worker.wait()
+                app.processEvents()
+            return len(window.filtered_data)
+        for label, func, args in (("display all rows", display, ()),
+                                  ("select all", select_all, ()),
+                                  ("invert selection", window.invert_selection, ()),
+                                  ("deselect all", window.deselect_all_rows, ()),
+                                  ("type 'fr' (GUI thread, debounced)", type_text, ('fr',)),
+                                  ("filter 'fr' and re-display", search, ('fr',)),
+                                  ("re-display filtered rows", window.update_table_display, ()),
+                                  ("clear filter and re-display", search, ('',))):
+            start = time.perf_counter()
+            func(*args)
+            print(f"  {label:<38} {time.perf_counter() - start:>8.3f} s")
+    window.data_table_model.clear()
+def legacy_search(dataset, needle):
+    """Dataset.search before the trigram index: every distinct value of every column tested per query"""
+    mask = np.zeros(len(dataset), dtype=bool)
+    for column in dataset.columns:
+        folded = column.folded_values()
+        matches = np.fromiter((needle in value for value in folded), dtype=bool, count=len(folded))
+        if matches.any():
+            mask |= column.expand(matches)
+    return np.flatnonzero(mask)
+def bench_search(rows):
+    print(f"\nFilter box search, {rows:,} rows")
+    dataset = recipient_dataset(rows)
+    start = time.perf_counter()
+    index = dataset.search_index()
+    print(f"  (index built in {time.perf_counter() - start:.2f} s, {index.nbytes() / (1024 * 1024):.1f} MB)")
+    typed = 'user4711@'
+    legacy_total = indexed_total = 0.0
+    for length in range(1, len(typed) + 1):
+        needle = typed[:length]
+        start = time.perf_counter()
+        legacy = legacy_search(dataset, needle)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = dataset.search(needle)
+        indexed_time = time.perf_counter() - start
+        assert np.array_equal(legacy, result), needle
+        legacy_total += legacy_time
+        indexed_total += indexed_time
+        print(f"  {needle!r:<14} {len(result):>9,} rows   scan (old) {legacy_time * 1000:>8.1f} ms   "
+              f"index (new) {indexed_time * 1000:>8.1f} ms")
+    for needle in ('last42', 'xyz', '@example'):
+        start = time.perf_counter()
+        legacy = legacy_search(dataset, needle)
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = dataset.search(needle)
+        indexed_time = time.perf_counter() - start
+        assert np.array_equal(legacy, result), needle
+        print(f"  {needle!r:<14} {len(result):>9,} rows   scan (old) {legacy_time * 1000:>8.1f} ms   "
+              f"index (new) {indexed_time * 1000:>8.1f} ms   (fresh query)")
+    print(f"  typing {typed!r}: scan {legacy_total:.2f} s, index {indexed_total:.2f} s in total")
+def legacy_display_ranks(column, cache={}):
+    """The per-column display-string ranks the old sort cached on the column"""
+    if id(column) not in cache:
+        display = column.display_values()
+        ranks = np.empty(len(display), dtype=np.int32)
+        rank = -1
+        previous = None
+        for code in sorted(range(len(display)), key=display.__getitem__):
+            if display[code] != previous:
+                rank += 1
+                previous = display[code]
+            ranks[code] = rank
+        cache[id(column)] = ranks
+    return cache[id(column)]
+def legacy_sort_by_column(view, column_index, reverse):
+    """DatasetView.sorted_by_column before typed sort keys: cached display-string ranks, stable argsort per call"""
+    column = view.dataset.columns[column_index]
+    keys = column.expand(legacy_display_ranks(column))[view.row_ids]
+    order = np.argsort(-keys if reverse else keys, kind='stable')
+    return view.row_ids[order]
+def bench_sort(rows):
+    print(f"\nSorting a filtered view, {rows:,} rows")
+    dataset = recipient_dataset(rows)
+    view = dataset.view(np.arange(0, rows, 2))
+    print(f"  (view of {len(view):,} rows)")
+    def timed(label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        print(f"  {label:<44} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+        return result
+    for column_index, name in ((4, 'Amount'), (2, 'Email')):
+        print(f"  by {name} ({dataset.columns[column_index].kind()}, {dataset.columns[column_index].encoding})")
+        timed("string ranks + argsort, first sort (old)", legacy_sort_by_column, view, column_index, False)
+        timed("re-sort, argsort again (old)", legacy_sort_by_column, view, column_index, False)
+        timed("typed ranks + lexsort, first sort (new)", view.sorted_by_column, column_index)
+        timed("re-sort, cached order (new)", view.sorted_by_column, column_index)
+        timed("descending, first sort (new)", view.sorted_by_column, column_index, True)
+        timed("descending again, cached order (new)", view.sorted_by_column, column_index, True)
+    keys = [(3, False), (4, True), (1, False)]
+    timed("Country, Amount Z-A, Last Name (first sort)", view.sorted_by_columns, keys)
+    timed("Country, Amount Z-A, Last Name (cached)", view.sorted_by_columns, keys)
+def mailing_list_dataset(rows):
+    """Recipient rows where one address in five repeats an earlier one (in another case) and a few are malformed"""
+    from dataset import Dataset
+    domains = ['example.com', 'gmail.com', 'gmial.com', 'corp.example.org', 'mail.example.de']
+    def address(i):
+        if i % 997 == 0:
+            return f'user{i} example.com'
+        if i % 5 == 4:
+            return f'USER{i // 2}@{domains[(i // 2) % len(domains)]}'.upper()
+        return f'user{i}@{domains[i % len(domains)]}'
+    dataset = Dataset.from_rows(['Name', 'Email'], ([f'Name{i}', address(i)] for i in range(rows)))
+    dataset.finalize()
+    return dataset
+def legacy_send_checks(dataset, column_index):
+    """The only address check before: '@' in the address, one row at a time at send time"""
+    return sum(1 for row_id in range(len(dataset)) if '@' not in str(dataset.value(row_id, column_index) or ''))
+def bench_recipients(rows):
+    from recipients import DuplicateIndex, AddressChecks
+    print(f"\nRecipient checks, {rows:,} rows")
+    dataset = mailing_list_dataset(rows)
+    column_index = 1
+    dataset.columns[column_index].display_values()
+    print(f"  (email column: {dataset.columns[column_index].encoding}, {len(dataset.columns[column_index].values):,} values)")
+    def timed(label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        print(f"  {label:<44} {time.perf_counter() - start:>8.2f} s")
+        return result
+    rejected = timed("'@' check per row (old, no duplicates)", legacy_send_checks, dataset, column_index)
+    index = timed("duplicate index", DuplicateIndex, dataset, column_index)
+    checks = timed("address validation", AddressChecks, dataset, column_index)
+    selected = np.arange(rows, dtype=np.int64)
+    redundant = timed("send guard over all rows", index.redundant_rows, selected)
+    print(f"  old check rejected {rejected:,} rows; {index.duplicate_group_count:,} repeated addresses, "
+          f"{len(redundant):,} rows skipped by the guard; {checks.invalid_row_count:,} flagged ({checks.summary()})")
+CAMPAIGN_SUBJECT = "Your {COUNTRY} statement, {First Name}"
+CAMPAIGN_BODY = ("<p>Dear {FIRST NAME} {Last Name},</p>\n"
+                 + "<p>Thank you for being a customer. Your balance is <b>{AMOUNT}</b>.</p>\n" * 20
+                 + "<p>We will write to <EMAIL> about changes in {Country}.</p>\n<p>Kind regards</p>")
+def legacy_render(headers, recipients, subject, template):
+    """send_emails before compiled templates: four str.replace calls per header on subject and body"""
+    rendered = []
+    for recipient in recipients:
+        email_body = template
+        email_subject = subject
+        for header in headers:
+            placeholders = [f"{{{header.upper()}}}", f"{{{header}}}", f"<{header.upper()}>", f"<{header}>"]
+            if header in recipient:
+                data = str(recipient[header]) if recipient[header] is not None else ""
+                for placeholder in placeholders:
+                    email_body = email_body.replace(placeholder, data)
+                    email_subject = email_subject.replace(placeholder, data)
+        rendered.append((email_subject, email_body))
+    return rendered
+def compiled_render(headers, recipients, subject, template):
+    from template_engine import compile_message, cell_text
+    subject_template, body_template, columns = compile_message(subject, template, headers)
+    rendered = []
+    values = [''] * len(headers)
+    for recipient in recipients:
+        for column_index in columns:
+            values[column_index] = cell_text(recipient.get(headers[column_index]))
+        rendered.append((subject_template.render(values), body_template.render(values)))
+    return rendered
+def batch_render(dataset, row_ids, subject, template):
+    from template_engine import compile_message, column_texts
+    subject_template, body_template, columns = compile_message(subject, template, dataset.headers)
+    texts = column_texts(dataset, row_ids, columns)
+    return list(zip(subject_template.render_all(texts, len(row_ids)), body_template.render_all(texts, len(row_ids))))
+def bench_render(rows):
+    dataset = recipient_dataset(rows)
+    headers = dataset.headers
+    recipients = [dict(zip(headers, row)) for row in dataset]
+    print(f"\nRendering {rows:,} messages ({len(CAMPAIGN_BODY):,} character body, {len(headers)} columns)")
+    results = []
+    for label, func in (("str.replace per header (old)", legacy_render), ("compiled template (new)", compiled_render)):
+        start = time.perf_counter()
+        results.append(func(headers, recipients, CAMPAIGN_SUBJECT, CAMPAIGN_BODY))
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<38} {elapsed:>8.2f} s   {rows / elapsed:>10,.0f} rows/s")
+    start = time.perf_counter()
+    results.append(batch_render(dataset, np.arange(rows), CAMPAIGN_SUBJECT, CAMPAIGN_BODY))
+    elapsed = time.perf_counter() - start
+    print(f"  {'column batch render (new)':<38} {elapsed:>8.2f} s   {rows / elapsed:>10,.0f} rows/s")
+    assert results[0] == results[1] == results[2]
+def legacy_extract_placeholders(text):
+    """PlaceholderExtractor.extract_placeholders before the tokenizer: seven regex passes over the text"""
+    import re
+    placeholders = set()
+    for pattern in (r'\{([^}]+)\}', r'<([^>]+)>', r'\[\[([^\]]+)\]\]', r'<<([^>]+)>>', r'\(([^)]+)\)',
+                    r'\{\{([^}]+)\}\}', r'\[([^\]]+)\]'):
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            match = match.strip().upper()
+            if match and any(c.isalpha() for c in match):
+                placeholders.add('{' + match + '}')
+    return sorted(placeholders)
+def bench_placeholders(rows):
+    from mail_merge_sender import PlaceholderExtractor
+    paragraph = ('<p style="margin: 0 0 8px 0">Dear {FIRST NAME}, your order (ref. [[ORDER ID]]) ships to '
+                 '<b><<CITY>></b> on {Ship Date} (local time).<br/></p>\n')
+    template = '<html><body>\n' + paragraph * rows + '</body></html>'
+    print(f"\nPlaceholder detection, {len(template) / (1024 * 1024):.1f} MB HTML template")
+    for label, func in (("seven regex passes (old)", legacy_extract_placeholders),
+                        ("single-pass tokenizer (new)", PlaceholderExtractor.extract_placeholders)):
+        start = time.perf_counter()
+        found = func(template)
+        print(f"  {label:<38} {time.perf_counter() - start:>8.2f} s   {', '.join(found)}")
+def legacy_suggest_mappings(placeholders, headers):
+    """PlaceholderExtractor.suggest_mappings before ColumnMatcher: substring tests of every pair"""
+    suggestions = {}
+    for placeholder in placeholders:
+        placeholder = placeholder.strip('{}').upper()
+        best_match = None
+        best_score = 0
+        for header in headers:
+            header = header.upper()
+            if placeholder == header:
+                best_match = header
+                best_score = 100
+                break
+            if placeholder in header or header in placeholder:
+                if 80 > best_score:
+                    best_match = header
+                    best_score = 80
+            common_mappings = {
+                ('NAME', 'FULLNAME', 'FULL_NAME'): ('NAME', 'PERSON', 'USER'),
+                ('EMAIL', 'MAIL', 'E_MAIL'): ('EMAIL', 'MAIL', '@')
+            }
+            for placeholder_group, header_keywords in common_mappings.items():
+                if placeholder in placeholder_group and any(keyword in header for keyword in header_keywords):
+                    if 60 > best_score:
+                        best_match = header
+                        best_score = 60
+        if best_match:
+            suggestions[placeholder] = best_match
+    return suggestions
+def bench_mapping(rows):
+    import random
+    from column_mapping import ColumnMatcher
+    rng = random.Random(7)
+    words = ('account contact billing shipping primary secondary lead opportunity owner created modified date amount '
+             'total region territory status stage source campaign score industry revenue employees website notes').split()
+    headers = list(dict.fromkeys(f"{' '.join(rng.sample(words, 3)).title()} {i}" for i in range(rows)))
+    headers[rows // 2:rows // 2 + 4] = ['E-mail Address', 'Given Name', 'Surname', 'Organisation']
+    placeholders = ['{' + name_key.upper() + '}' for name_key in
+                    ('email', 'first name', 'last name', 'company name')] + [
+        '{' + rng.choice(headers).upper().replace(' ', '_') + '}' for _ in range(rows - 4)]
+    print(f"\nColumn suggestions, {len(placeholders):,} placeholders x {len(headers):,} columns")
+    for label, func in (("substring tests per pair (old)", legacy_suggest_mappings),
+                        ("ColumnMatcher (new)", lambda p, h: ColumnMatcher(h).suggest(p))):
+        start = time.perf_counter()
+        suggestions = func(placeholders, headers)
+        elapsed = time.perf_counter() - start
+        found = [suggestions.get(p, suggestions.get(p.strip('{}'), '-')) for p in placeholders[:4]]
+        print(f"  {label:<38} {elapsed:>8.3f} s   {len(suggestions):>5,} suggested; "
+              f"email/first/last/company -> {', '.join(found)}")
+def legacy_format(data, settings):
+    """UniversalSender.format_column_data_new before ColumnFormatter: one str.replace pass per rule"""
+    formatted = str(data)
+    for find_text, replace_text, special_type in settings.get('replacements', []):
+        if find_text:
+            formatted = formatted.replace(find_text, special_type if special_type is not None else replace_text)
+    if settings.get('bullet_enabled', False):
+        bullet = settings.get('bullet', '-')
+        formatted = '\n'.join(f"\t{bullet} {line.strip()}" for line in formatted.split('\n') if line.strip())
+    return formatted
+def bench_formatting(rows):
+    import random
+    from column_formatting import ColumnFormatter
+    rng = random.Random(11)
+    words = ['lorem', 'ipsum', 'dolor', 'sit', 'amet', '[code007]', '[code002]', 'approx.', 'N/A']
+    cells = ['\n'.join(' '.join(rng.choice(words) for _ in range(12)) for _ in range(40)) for _ in range(rows)]
+    print(f"\nFormatting {rows:,} cells ({sum(map(len, cells)) / (1024 * 1024):.1f} MB, 40 lines each)")
+    for rule_count in (10, 30, 100, 300):
+        replacements = [('approx.', 'approximately', None), ('N/A', '-', None)] + [
+            (f"[code{i:03d}]", f"<CODE {i}>", None) for i in range(rule_count - 2)]
+        settings = {'replacements': replacements, 'bullet_enabled': True, 'bullet': '•'}
+        start = time.perf_counter()
+        expected = [legacy_format(cell, settings) for cell in cells]
+        legacy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        formatter = ColumnFormatter(settings)
+        formatted = [formatter.format(cell) for cell in cells]
+        compiled_time = time.perf_counter() - start
+        assert formatted == expected
+        print(f"  {rule_count:>4} rules   str.replace per rule (old) {legacy_time:>7.2f} s   "
+              f"compiled rules (new) {compiled_time:>7.2f} s   {formatter.pass_count} passes")
+    # An everyday rule list: spelling fixes and abbreviations whose finds and replacements share letters
+    spellings = {'color': 'colour', 'honor': 'honour', 'favor': 'favour', 'center': 'centre', 'theater': 'theatre',
+                 'meter': 'metre', 'liter': 'litre', 'fiber': 'fibre', 'analyze': 'analyse', 'organize': 'organise',
+                 'realize': 'realise', 'program': 'programme', 'catalog': 'catalogue', 'dialog': 'dialogue',
+                 'gray': 'grey', 'tire': 'tyre', 'curb': 'kerb', 'plow': 'plough', 'check': 'cheque', 'mold': 'mould',
+                 'approx.': 'approximately', 'N/A': '-', 'e.g.': 'for example', 'etc.': 'and so on'}
+    prose = list(spellings) + ['the', 'new', 'order', 'was', 'sent', 'today', 'and', 'we', 'will', 'call']
+    cells = ['\n'.join(' '.join(rng.choice(prose) for _ in range(12)) for _ in range(40)) for _ in range(rows)]
+    settings = {'replacements': [(find, replacement, None) for find, replacement in spellings.items()],
+                'bullet_enabled': True, 'bullet': '•'}
+    start = time.perf_counter()
+    expected = [legacy_format(cell, settings) for cell in cells]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    formatter = ColumnFormatter(settings)
+    formatted = [formatter.format(cell) for cell in cells]
+    compiled_time = time.perf_counter() - start
+    assert formatted == expected
+    print(f"  {len(spellings):>4} words   str.replace per rule (old) {legacy_time:>7.2f} s   "
+          f"compiled rules (new) {compiled_time:>7.2f} s   {formatter.pass_count} passes")
+def bench_format_cache(rows):
+    import random
+    from column_formatting import ColumnFormatter, FormattedValueCache
+    rng = random.Random(5)
+    items = ['Widget', 'Gadget', 'Adapter', 'Cable', 'Charger', 'Case', 'Stand', 'Dock']
+    # A campaign column with a few hundred distinct values, e.g. the products of each order
+    distinct = ['; '.join(rng.sample(items, rng.randint(2, 6))) for _ in range(300)]
+    cells = [rng.choice(distinct) for _ in range(rows)]
+    settings = {'replacements': [('; ', '', '\n')] + [(f"{item}", f"{item} (in stock)", None) for item in items],
+                'bullet_enabled': True, 'bullet': '•'}
+    formatter = ColumnFormatter(settings)
+    print(f"\nFormatting a column of {rows:,} rows, {len(set(cells)):,} distinct values")
+    start = time.perf_counter()
+    expected = [formatter.format(cell) for cell in cells]
+    print(f"  {'format every row (old)':<38} {time.perf_counter() - start:>8.2f} s")
+    cache = FormattedValueCache()
+    start = time.perf_counter()
+    formatted = [cache.format('Items', cell, formatter) for cell in cells]
+    print(f"  {'FormattedValueCache (new)':<38} {time.perf_counter() - start:>8.2f} s   {cache.summary()}")
+    assert formatted == expected
+def bench_stream(rows):
+    from mail_merge_sender import RecipientStream
+    from template_engine import compile_message, column_texts
+    dataset = recipient_dataset(rows)
+    subject_template, body_template, columns = compile_message(CAMPAIGN_SUBJECT, CAMPAIGN_BODY, dataset.headers)
+    def render_chunk(row_ids):
+        texts = column_texts(dataset, row_ids, columns)
+        return [{'_processed_subject': subject, '_processed_template': body} for subject, body in
+                zip(subject_template.render_all(texts, len(row_ids)), body_template.render_all(texts, len(row_ids)))]
+    row_ids = np.arange(rows)
+    print(f"\nRender-to-send, {rows:,} messages ({len(CAMPAIGN_BODY):,} character body)")
+    for label, recipients in (("render all, then send (old)", None),
+                              ("RecipientStream (new)", RecipientStream(row_ids, render_chunk))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        first = None
+        sent = 0
+        for recipient in (render_chunk(row_ids) if recipients is None else recipients):
+            if first is None:
+                first = time.perf_counter() - start
+            sent += len(recipient['_processed_template'])
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label:<38} first message after {first * 1000:>8.1f} ms   all {elapsed:>6.2f} s   "
+              f"peak {peak / (1024 * 1024):>8.1f} MB")
+BENCHMARKS = {
+    'excel': bench_excel,
+    'word': bench_word,
+    'table': bench_table,
+    'search': bench_search,
+    'sort': bench_sort,
+    'recipients': bench_recipients,
+    'render': bench_render,
+    'placeholders': bench_placeholders,
+    'mapping': bench_mapping,
+    'formatting': bench_formatting,
+    'format-cache': bench_format_cache,
+    'stream': bench_stream,
+}
+def main():
+    parser = argparse.ArgumentParser(description="Universal Email Sender benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--rows', type=int, default=100000, help="number of data rows to generate")
+    args = parser.parse_args()
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        BENCHMARKS[name](args.rows)
+if __name__ == "__main__":
+    main()
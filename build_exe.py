@@ -60,6 +60,17 @@ def build_executable():
         '--hidden-import=theme',
         '--hidden-import=loading_screen',
         '--hidden-import=mail_merge_sender',
+        '--hidden-import=dataset',
+        '--hidden-import=search_index',
+        '--hidden-import=data_table_model',
+        '--hidden-import=row_selection',
+        '--hidden-import=recipients',
+        '--hidden-import=template_engine',
+        '--hidden-import=column_mapping',
+        '--hidden-import=column_formatting',
+        '--hidden-import=import_cache',
+        '--hidden-import=delimited_text',
+        '--hidden-import=word_tables',
         '--hidden-import=PyQt5',
         '--hidden-import=PyQt5.QtCore',
         '--hidden-import=PyQt5.QtGui',
@@ -69,6 +80,7 @@ def build_executable():
         '--hidden-import=pythoncom',
         '--hidden-import=pywintypes',
         '--hidden-import=pandas',
+        '--hidden-import=numpy',
         '--hidden-import=openpyxl',
         '--hidden-import=docx',
         '--collect-all=pywin32',
@@ -120,7 +132,7 @@ def main():
     print("="*60 + "\n")
     print(f"Python version: {sys.version}")
     print(f"Working directory: {os.getcwd()}\n")
-    required_files = ['main.py', 'mail_merge_sender.py', 'theme.py', 'loading_screen.py']
+    required_files = ['main.py', 'mail_merge_sender.py', 'dataset.py', 'search_index.py', 'data_table_model.py', 'row_selection.py', 'recipients.py', 'template_engine.py', 'column_mapping.py', 'column_formatting.py', 'import_cache.py', 'delimited_text.py', 'word_tables.py', 'theme.py', 'loading_screen.py']
     missing_files = [f for f in required_files if not os.path.exists(f)]
     if missing_files:
         print(f"[!] Missing required files: {', '.join(missing_files)}")
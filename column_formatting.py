@@ -0,0 +1,156 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+# Below this many rules a stage is faster as one str.replace per rule than as one regex pass
+MIN_PATTERN_RULES = 24
+DEFAULT_FORMAT_CACHE_SIZE = 20000
+class _Stage:
+    """Rules applied in one pass. A later rule joins unless it chains on the stage's output:
+    its find lies within a replacement or contains one, or the stage deletes text (which joins
+    its neighbours into any find longer than one character). A find that would only run
+    across the edge of a replacement is not matched there - that is what lets ordinary word
+    lists share a pass. exact records whether no find can overlap another find or a
+    replacement at all; only then does one str.replace per rule give the same text."""
+    def __init__(self):
+        self.rules = []
+        self.finds = []
+        self.outputs = []
+        self.prefixes = set()
+        self.suffixes = set()
+        self.deletes = False
+        self.exact = True
+    def accepts(self, find: str) -> bool:
+        if self.deletes and len(find) > 1:
+            return False
+        return not any(find in output or output in find for output in self.outputs)
+    def add(self, find: str, replacement: str):
+        if self.exact:
+            self.exact = not (any(find in text or text in find for text in self.finds + self.outputs)
+                              or any(find[:k] in self.suffixes or find[-k:] in self.prefixes for k in range(1, len(find))))
+        self.rules.append((find, replacement))
+        self.deletes = self.deletes or not replacement
+        self.finds.append(find)
+        if replacement:
+            self.outputs.append(replacement)
+        for text in (find, replacement) if replacement else (find,):
+            self.prefixes.update(text[:k] for k in range(1, len(text)))
+            self.suffixes.update(text[-k:] for k in range(1, len(text)))
+def _trie_pattern(finds: Sequence[str]) -> str:
+    """Alternation of finds with common prefixes factored out ("[ab]" and "[ac]" -> "\\[a(?:b|c)\\]"),
+    so the regex engine follows one branch per character instead of trying every find in turn.
+    A find that is a prefix of another makes the rest optional and greedy, so at any
+    position the longest find wins."""
+    trie = {}
+    for find in finds:
+        node = trie
+        for character in find:
+            node = node.setdefault(character, {})
+        node[''] = {}
+    def branch(node: dict) -> str:
+        branches = [re.escape(character) + branch(child) for character, child in node.items() if character]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return (pattern if len(branches) > 1 else '(?:' + pattern + ')') + '?'
+        return pattern
+    return branch(trie)
+def compile_stages(rules: Sequence[Tuple[str, str]]) -> List[Tuple[Any, Any]]:
+    """Split ordered (find, replacement) rules into stages, starting a new stage where a rule
+    chains on an earlier rule of the stage (see _Stage), so that rule sees the earlier output
+    as it would with one str.replace per rule. Within a stage all finds are matched in one
+    scan: where matches overlap, the leftmost wins, then the longest (the first rule for equal
+    finds). An exact stage of fewer than MIN_PATTERN_RULES rules stays (find, replacement)
+    pairs for str.replace, which gives the same text; every other stage is compiled into one
+    regex and applied in a single pass."""
+    stages = [_Stage()]
+    for find, replacement in rules:
+        if stages[-1].rules and not stages[-1].accepts(find):
+            stages.append(_Stage())
+        stages[-1].add(find, replacement)
+    compiled = []
+    for stage in stages:
+        if not stage.rules:
+            continue
+        if len(stage.rules) < MIN_PATTERN_RULES and stage.exact:
+            compiled.extend(stage.rules)
+        else:
+            replacements = {}
+            for find, replacement in stage.rules:
+                replacements.setdefault(find, replacement)
+            compiled.append((re.compile('(' + _trie_pattern(list(replacements)) + ')'), replacements))
+    return compiled
+class ColumnFormatter:
+    """The Template Formatting settings of one column, compiled once for every cell it formats.
+    Find/replace rules are applied in as few passes as chaining allows: a rule sees the output
+    of the rules before it wherever that output could form its find, and overlapping matches
+    in the original text go to the leftmost, then longest find (see compile_stages). Bullets
+    are applied afterwards to every non-blank line."""
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.rules = []
+        for rule in settings.get('replacements', []):
+            find_text, replace_text, special_type = rule if len(rule) == 3 else (rule[0], rule[1], None)
+            if find_text:
+                self.rules.append((find_text, special_type if special_type is not None else replace_text))
+        self._passes = compile_stages(self.rules)
+        self.bullet = settings.get('bullet', '-') if settings.get('bullet_enabled', False) else None
+    @property
+    def pass_count(self) -> int:
+        """Passes format makes over a cell for the replacement rules"""
+        return len(self._passes)
+    def format(self, text: str) -> str:
+        for find, replacement in self._passes:
+            if isinstance(find, str):
+                text = text.replace(find, replacement)
+            else:
+                # Split on the capturing pattern: matches land on the odd positions
+                parts = find.split(text)
+                parts[1::2] = [replacement[match] for match in parts[1::2]]
+                text = ''.join(parts)
+        if self.bullet is not None:
+            text = '\n'.join(f"\t{self.bullet} {line}" for line in (line.strip() for line in text.split('\n')) if line)
+        return text
+class FormattedValueCache:
+    """Bounded LRU cache of formatted cell text, keyed by (column, raw text, rule-set version).
+    Recipients often share a value (a product list, a region), so formatting runs once per
+    distinct value per rule set. A rule edit bumps the column's version and drops only that
+    column's entries. hits and misses count lookups since the last reset_stats()."""
+    def __init__(self, max_entries: int = DEFAULT_FORMAT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+    def __len__(self) -> int:
+        return len(self._entries)
+    def version(self, column: str) -> int:
+        return self._versions.get(column, 0)
+    def invalidate(self, column: str):
+        """Forget the formatted values of column after its rules changed"""
+        self._versions[column] = self.version(column) + 1
+        for key in [key for key in self._entries if key[0] == column]:
+            del self._entries[key]
+    def format(self, column: str, text: str, formatter: ColumnFormatter) -> str:
+        """formatter.format(text), computed once per distinct text of column while it stays cached"""
+        key = (column, text, self._versions.get(column, 0))
+        formatted = self._entries.get(key)
+        if formatted is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return formatted
+        self.misses += 1
+        formatted = self._entries[key] = formatter.format(text)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return formatted
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+    def summary(self) -> str:
+        """Counts on one line, e.g. '95,000 of 100,000 formatted values from cache (95.0%)'"""
+        return (f"{self.hits:,} of {self.hits + self.misses:,} formatted values from cache "
+                f"({self.hit_rate():.1%})")
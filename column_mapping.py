@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+logger = logging.getLogger(__name__)
+DEFAULT_MAPPING_FILE = os.path.join(os.path.expanduser('~'), 'EmailSender_Settings', 'column_mappings.json')
+MAPPING_FILE_VERSION = 1
+MIN_SUGGESTION_SCORE = 0.45
+EXACT_SCORE = 1.0
+LEARNED_SCORE = 0.96
+SYNONYM_SCORE = 0.9
+SIMILARITY_WEIGHT = 0.85
+# Built-in synonym table: every name of a group stands for the first one
+SYNONYM_GROUPS = (
+    ('email', 'e mail', 'mail', 'email address', 'e mail address', 'mail address', 'emailaddress'),
+    ('first name', 'firstname', 'fname', 'given name', 'givenname', 'forename', 'first'),
+    ('last name', 'lastname', 'lname', 'surname', 'family name', 'familyname', 'last'),
+    ('name', 'full name', 'fullname', 'contact name', 'contact', 'person', 'recipient', 'recipient name'),
+    ('company', 'company name', 'companyname', 'organization', 'organisation', 'org', 'employer', 'account name', 'business'),
+    ('phone', 'phone number', 'telephone', 'tel', 'mobile', 'mobile phone', 'cell', 'cell phone'),
+    ('title', 'job title', 'jobtitle', 'position', 'role'),
+    ('address', 'street', 'street address', 'address line 1', 'address1', 'mailing address'),
+    ('city', 'town', 'locality'),
+    ('zip', 'zip code', 'zipcode', 'postcode', 'postal code', 'post code'),
+    ('state', 'province', 'region', 'county'),
+    ('country', 'nation', 'country name')
+)
+# Spellings of a word that mean the same inside longer names ("Customer Mail" -> "customer email")
+WORD_SYNONYMS = {
+    'mail': 'email', 'emails': 'email', 'tel': 'phone', 'telephone': 'phone', 'mobile': 'phone', 'cell': 'phone',
+    'zipcode': 'zip', 'postcode': 'zip', 'organisation': 'company', 'organization': 'company', 'org': 'company',
+    'employer': 'company', 'no': 'number', 'num': 'number', 'nr': 'number', 'town': 'city', 'province': 'state', 'surname': 'last name', 'forename': 'first name'
+}
+_SYNONYMS = {alias: group[0] for group in SYNONYM_GROUPS for alias in group}
+_PHRASE_PATTERN = re.compile(r'\b(?:' + '|'.join(
+    re.escape(alias) for alias in sorted((alias for alias in _SYNONYMS if ' ' in alias), key=len, reverse=True)) + r')\b')
+_WORD_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+|[^\W\d_A-Za-z]+')
+def name_key(name: str) -> str:
+    """Spelling-independent form of a placeholder or header name: words split at case changes,
+    digits and punctuation, lower-cased and joined by single spaces ("{First_Name}" -> "first name")"""
+    return ' '.join(word.lower() for word in _WORD_PATTERN.findall(str(name).strip('{}<>[]() ')))
+def canonical_key(key: str) -> str:
+    """name_key with synonyms folded to one name of their group ("e mail address" -> "email")"""
+    if key in _SYNONYMS:
+        return _SYNONYMS[key]
+    key = _PHRASE_PATTERN.sub(lambda match: _SYNONYMS[match.group()], key)
+    key = ' '.join(dict.fromkeys(WORD_SYNONYMS.get(word, word) for word in key.split()))
+    return _SYNONYMS.get(key, key)
+def _trigrams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+class MappingMemory:
+    """Placeholder-to-column mappings the user chose by hand, kept across sessions.
+    Counts are stored per pair of canonical keys in a small JSON file, so "{E-Mail}" mapped
+    to "Contact Email" once is suggested again for "{EMAIL}" and a "contact_email" column."""
+    def __init__(self, path: str = DEFAULT_MAPPING_FILE):
+        self.path = path
+        self._pairs = None
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        if self._pairs is None:
+            self._pairs = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as handle:
+                        stored = json.load(handle)
+                    if stored.get('version') == MAPPING_FILE_VERSION:
+                        self._pairs = {placeholder: {header: int(count) for header, count in headers.items()}
+                                       for placeholder, headers in stored.get('mappings', {}).items()}
+                except (OSError, ValueError, AttributeError) as e:
+                    logger.warning(f"Ignoring unreadable column mapping file {self.path}: {e}")
+        return self._pairs
+    def learned(self, placeholder_key: str) -> Dict[str, int]:
+        """Canonical header keys chosen for a canonical placeholder key, with how often"""
+        return self._load().get(placeholder_key, {})
+    def remember(self, mappings: Dict[str, str]):
+        """Record chosen {placeholder: header} mappings and write them to disk.
+        Pairs that already share a name need no memory and are not stored."""
+        pairs = self._load()
+        for placeholder, header in mappings.items():
+            placeholder_key, header_key = canonical_key(name_key(placeholder)), canonical_key(name_key(header))
+            if placeholder_key and header_key and placeholder_key != header_key:
+                learned = pairs.setdefault(placeholder_key, {})
+                learned[header_key] = learned.get(header_key, 0) + 1
+        self.save()
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump({'version': MAPPING_FILE_VERSION, 'mappings': self._load()}, handle)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save column mappings to {self.path}: {e}")
+class ColumnMatcher:
+    """Ranks the columns of a data source as targets for template placeholders.
+    Headers are normalized, tokenized and split into character trigrams once, into posting
+    arrays from word and trigram to columns. Scoring a placeholder counts its shared words and
+    trigrams for every column at once with np.bincount over those postings, so hundreds of
+    placeholders against hundreds of columns take milliseconds. Ranking:
+    same name > chosen by the user before (MappingMemory) > synonyms > word and trigram similarity."""
+    def __init__(self, headers: Sequence[str], memory: Optional[MappingMemory] = None):
+        self.headers = list(headers)
+        self.memory = memory
+        self._keys = {}
+        self._canonical = {}
+        words_by_column = []
+        trigrams_by_column = []
+        for column_index, header in enumerate(self.headers):
+            key = name_key(header)
+            canonical = canonical_key(key)
+            self._keys.setdefault(key, column_index)
+            self._canonical.setdefault(canonical, []).append(column_index)
+            words_by_column.append(set(canonical.split()))
+            trigrams_by_column.append(_trigrams(canonical))
+        self._words = self._postings(words_by_column)
+        self._trigrams = self._postings(trigrams_by_column)
+        self._word_counts = np.array([len(words) for words in words_by_column], dtype=np.float64)
+        self._trigram_counts = np.array([len(trigrams) for trigrams in trigrams_by_column], dtype=np.float64)
+    @staticmethod
+    def _postings(grams_by_column: List[set]) -> Dict[str, np.ndarray]:
+        postings = {}
+        for column_index, grams in enumerate(grams_by_column):
+            for gram in grams:
+                postings.setdefault(gram, []).append(column_index)
+        return {gram: np.array(columns, dtype=np.int32) for gram, columns in postings.items()}
+    def _hits(self, postings: Dict[str, np.ndarray], grams: set) -> np.ndarray:
+        found = [postings[gram] for gram in grams if gram in postings]
+        if not found:
+            return np.zeros(len(self.headers))
+        return np.bincount(np.concatenate(found), minlength=len(self.headers)).astype(np.float64)
+    def scores(self, placeholder: str) -> np.ndarray:
+        """Score per column for placeholder: 0 for nothing in common, 1 for the same name.
+        Learned mappings score a little higher the more often they were chosen, but never
+        reach a column that carries the placeholder's own name."""
+        key = name_key(placeholder)
+        canonical = canonical_key(key)
+        if not canonical or not self.headers:
+            return np.zeros(len(self.headers))
+        words = set(canonical.split())
+        trigrams = _trigrams(canonical)
+        shared_words = self._hits(self._words, words)
+        # Containment counts as much as overlap, so {EMAIL} still scores well against "Customer Email"
+        word_score = (shared_words / len(words) + shared_words / (len(words) + self._word_counts - shared_words)) / 2
+        trigram_score = 2 * self._hits(self._trigrams, trigrams) / (len(trigrams) + self._trigram_counts)
+        scores = SIMILARITY_WEIGHT * (word_score + trigram_score) / 2
+        scores[self._canonical.get(canonical, [])] = SYNONYM_SCORE
+        if self.memory is not None:
+            for header_key, count in self.memory.learned(canonical).items():
+                scores[self._canonical.get(header_key, [])] = LEARNED_SCORE + count / (count + 1) / 100
+        if key in self._keys:
+            scores[self._keys[key]] = EXACT_SCORE
+        return scores
+    def rank(self, placeholder: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Best columns for placeholder as (header, score), best first, earlier column first on ties"""
+        scores = self.scores(placeholder)
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [(self.headers[column_index], min(float(scores[column_index]), 1.0))
+                for column_index in order.tolist() if scores[column_index] > 0]
+    def suggest(self, placeholders: Sequence[str], min_score: float = MIN_SUGGESTION_SCORE) -> Dict[str, str]:
+        """Best column per placeholder scoring at least min_score, keyed by placeholder as given"""
+        suggestions = {}
+        for placeholder in placeholders:
+            scores = self.scores(placeholder)
+            if len(scores):
+                column_index = int(np.argmax(scores))
+                if scores[column_index] >= min_score:
+                    suggestions[placeholder] = self.headers[column_index]
+        return suggestions
@@ -0,0 +1,98 @@
+from typing import List
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+from dataset import DatasetView
+from recipients import ADDRESS_VALID, ADDRESS_WHITESPACE
+from theme import var_theme
+CHECK_COLUMN_HEADER = "✓"
+class DataTableModel(QAbstractTableModel):
+    """Table model for the Import Data grid: a checkbox column followed by the dataset columns.
+    Nothing is stored per row - cell text is read from the dataset when the view paints a cell,
+    so only the visible rows are ever materialized. The checkbox of a row reflects whether
+    its dataset row id is in the selection, and toggling it edits the selection in place.
+    With address checks set, email cells with an issue are colored and explain it in their tooltip."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.view = None
+        self.headers = []
+        self.selection = set()
+        self.address_checks = None
+    def set_view(self, view: DatasetView, headers: List[str], selection):
+        """Show the rows of view; selection is kept by reference, not copied"""
+        self.beginResetModel()
+        self.view = view
+        self.headers = list(headers)
+        self.selection = selection
+        self.endResetModel()
+    def set_address_checks(self, address_checks):
+        """Overlay the verdicts of an AddressChecks (or None to remove the overlay) on the email column"""
+        self.address_checks = address_checks
+        rows = self.rowCount()
+        if rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, self.columnCount() - 1))
+    def clear(self):
+        self.beginResetModel()
+        self.view = None
+        self.headers = []
+        self.address_checks = None
+        self.endResetModel()
+    def refresh_check_states(self):
+        """Repaint the checkbox column after the selection was changed outside the model"""
+        rows = self.rowCount()
+        if rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(rows - 1, 0), [Qt.CheckStateRole])
+    def row_id(self, row: int) -> int:
+        return self.view.row_id(row)
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid() or self.view is None:
+            return 0
+        return len(self.view)
+    def columnCount(self, parent=QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.headers) + 1
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or self.view is None:
+            return None
+        column = index.column()
+        if column == 0:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self.view.row_id(index.row()) in self.selection else Qt.Unchecked
+            return None
+        checks = self.address_checks
+        if checks is not None and column - 1 == checks.column_index and role in (Qt.ForegroundRole, Qt.ToolTipRole):
+            row_id = self.view.row_id(index.row())
+            verdict = checks.verdict(row_id)
+            if verdict != ADDRESS_VALID:
+                if role == Qt.ForegroundRole:
+                    return QColor(var_theme.colors['warning' if verdict == ADDRESS_WHITESPACE else 'error'])
+                return f"{self.view.dataset.display_value(row_id, column - 1)}\n{checks.describe(row_id)}"
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.view.dataset.display_value(self.view.row_id(index.row()), column - 1)
+        return None
+    def setData(self, index, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != 0 or role != Qt.CheckStateRole:
+            return False
+        row_id = self.view.row_id(index.row())
+        if value == Qt.Checked:
+            self.selection.add(row_id)
+        else:
+            self.selection.discard(row_id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() == 0:
+            return Qt.ItemIsUserCheckable | Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        if section == 0:
+            return CHECK_COLUMN_HEADER
+        if section - 1 < len(self.headers):
+            return str(self.headers[section - 1])
+        return None
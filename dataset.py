@@ -0,0 +1,488 @@
+import sys
+import datetime
+from typing import List, Dict, Any, Iterable, Sequence, Tuple, Callable
+import numpy as np
+from search_index import SearchIndex, SearchCancelled
+from recipients import DuplicateIndex, AddressChecks
+_NAN_KEY = object()
+PLAIN_CARDINALITY_RATIO = 0.5
+SEARCH_CANCEL_INTERVAL = 10000
+_NUMBER_START = frozenset('+-.0123456789')
+def _value_key(value):
+    """Dictionary key for a cell value - keeps 1 and 1.0 apart and folds every NaN into one entry"""
+    cls = value.__class__
+    if cls is str:
+        return value
+    if cls is float and value != value:
+        return _NAN_KEY
+    return (cls, value)
+def _is_missing(value) -> bool:
+    """None, NaN or NaT - pandas' NaT is a datetime that, like NaN, is not equal to itself"""
+    return value is None or (isinstance(value, (float, datetime.datetime)) and value != value)
+def _text_kind(text: str) -> str:
+    """integer, float or text, for a string cell"""
+    if text[:1] not in _NUMBER_START:
+        return 'text' if text else 'empty'
+    try:
+        int(text)
+        return 'integer'
+    except ValueError:
+        pass
+    try:
+        return 'float' if float(text) == float(text) and abs(float(text)) != float('inf') else 'text'
+    except ValueError:
+        return 'text'
+def infer_kind(values: Iterable) -> str:
+    """Type of a column from its distinct values: empty, boolean, integer, float, datetime, text or mixed.
+    Strings count as integer or float only when every non-blank string parses as a number,
+    so columns from TXT and Word imports get a type too."""
+    kinds = set()
+    text_kinds = set()
+    for value in values:
+        if _is_missing(value):
+            continue
+        if isinstance(value, str):
+            text_kinds.add(_text_kind(value.strip()))
+        elif isinstance(value, bool):
+            kinds.add('boolean')
+        elif isinstance(value, int):
+            kinds.add('integer')
+        elif isinstance(value, float):
+            kinds.add('float')
+        elif isinstance(value, (datetime.date, datetime.time)):
+            kinds.add('datetime')
+        else:
+            kinds.add('mixed')
+    text_kinds.discard('empty')
+    if text_kinds:
+        kinds.add('text' if 'text' in text_kinds else 'float' if 'float' in text_kinds else 'integer')
+    if not kinds:
+        return 'empty'
+    if kinds == {'integer', 'float'}:
+        return 'float'
+    return kinds.pop() if len(kinds) == 1 else 'mixed'
+def _is_blank(value) -> bool:
+    return _is_missing(value) or (isinstance(value, str) and not value.strip())
+def _number_sort_key(value, display: str):
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    return value
+def _datetime_sort_key(value, display: str):
+    """(day, seconds) so dates, datetimes and times compare with each other"""
+    if isinstance(value, datetime.datetime):
+        return (value.toordinal(), value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6)
+    if isinstance(value, datetime.date):
+        return (value.toordinal(), 0.0)
+    return (0, value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6)
+def _text_sort_key(value, display: str):
+    return display.casefold()
+_SORT_KEYS = {
+    'integer': _number_sort_key,
+    'float': _number_sort_key,
+    'boolean': _number_sort_key,
+    'datetime': _datetime_sort_key,
+}
+class _Column:
+    """Per-distinct-value caches shared by both column encodings.
+    values only ever grows, so each cache is extended rather than rebuilt after appends."""
+    __slots__ = ()
+    def display_values(self) -> List[str]:
+        """Display string of every entry of values, computed once per value"""
+        display = self._display
+        if len(display) < len(self.values):
+            display.extend(str(value) if value is not None else '' for value in self.values[len(display):])
+        return display
+    def blank_values(self) -> np.ndarray:
+        """Whether each entry of values is blank: None, NaN or whitespace-only text.
+        Decided from the raw value, since a NaN cell displays as 'nan'."""
+        return np.fromiter(map(_is_blank, self.values), dtype=bool, count=len(self.values))
+    def folded_values(self) -> List[str]:
+        """Lower-cased display strings, for case-insensitive search"""
+        folded = self._folded
+        display = self.display_values()
+        if len(folded) < len(display):
+            folded.extend(text.lower() for text in display[len(folded):])
+        return folded
+    def sort_ranks(self) -> np.ndarray:
+        """Rank of every entry of values in the column's natural order - numbers numerically, dates
+        chronologically, anything else as case-folded text. Equal keys share a rank; blanks get -1."""
+        if self._ranks is None or len(self._ranks) != len(self.values):
+            sort_key = _SORT_KEYS.get(self.kind(), _text_sort_key)
+            display = self.display_values()
+            codes = [code for code, value in enumerate(self.values) if not _is_blank(value)]
+            keys = [sort_key(self.values[code], display[code]) for code in codes]
+            ranks = np.full(len(self.values), -1, dtype=np.int32)
+            rank = -1
+            previous = None
+            for position in sorted(range(len(codes)), key=keys.__getitem__):
+                key = keys[position]
+                if rank < 0 or key != previous:
+                    rank += 1
+                    previous = key
+                ranks[codes[position]] = rank
+            self._ranks = ranks
+        return self._ranks
+    def kind(self) -> str:
+        if self._kind is None or self._kind[0] != len(self.values):
+            self._kind = (len(self.values), infer_kind(self.values))
+        return self._kind[1]
+class DictionaryColumn(_Column):
+    """Dictionary-encoded column: one int32 code per row plus the list of distinct values"""
+    __slots__ = ('values', '_lookup', '_chunks', '_pending', '_display', '_folded', '_ranks', '_kind')
+    encoding = 'dictionary'
+    def __init__(self):
+        self.values = []
+        self._lookup = {}
+        self._chunks = []
+        self._pending = []
+        self._display = []
+        self._folded = []
+        self._ranks = None
+        self._kind = None
+    @classmethod
+    def from_codes(cls, values: List[Any], codes: np.ndarray) -> 'DictionaryColumn':
+        """Wrap already-encoded data, e.g. a memory-mapped codes array from the import cache"""
+        column = cls()
+        column.values = values
+        column._lookup = None
+        column._chunks = [codes]
+        return column
+    def _ensure_lookup(self):
+        if self._lookup is None:
+            self._lookup = {_value_key(value): code for code, value in enumerate(self.values)}
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks) + len(self._pending)
+    def code(self, value) -> int:
+        """Code of value, adding it to the dictionary if it is new"""
+        self._ensure_lookup()
+        key = _value_key(value)
+        code = self._lookup.get(key)
+        if code is None:
+            code = len(self.values)
+            self._lookup[key] = code
+            self.values.append(value)
+        return code
+    def append(self, value):
+        self._pending.append(self.code(value))
+    def extend_codes(self, codes: np.ndarray):
+        """Append rows given as codes into values"""
+        self.flush()
+        self._chunks.append(np.asarray(codes, dtype=np.int32))
+    def extend(self, values: Iterable):
+        self._ensure_lookup()
+        lookup = self._lookup
+        distinct = self.values
+        pending = self._pending
+        for value in values:
+            key = _value_key(value)
+            code = lookup.get(key)
+            if code is None:
+                code = len(distinct)
+                lookup[key] = code
+                distinct.append(value)
+            pending.append(code)
+        self.flush()
+    def flush(self):
+        """Pack pending codes into an int32 chunk"""
+        if self._pending:
+            self._chunks.append(np.array(self._pending, dtype=np.int32))
+            self._pending = []
+    @property
+    def codes(self) -> np.ndarray:
+        self.flush()
+        if len(self._chunks) != 1:
+            self._chunks = [np.concatenate(self._chunks) if self._chunks else np.empty(0, dtype=np.int32)]
+        return self._chunks[0]
+    def value(self, row_id: int) -> Any:
+        return self.values[self.codes[row_id]]
+    def display(self, row_id: int) -> str:
+        return self.display_values()[self.codes[row_id]]
+    def expand(self, per_value: np.ndarray) -> np.ndarray:
+        """Map an array indexed by code to one entry per row"""
+        return per_value[self.codes]
+    def nbytes(self) -> int:
+        """Approximate memory held by the codes, the distinct values and the lookup table"""
+        lookup = sys.getsizeof(self._lookup) if self._lookup else 0
+        return self.codes.nbytes + lookup + sum(sys.getsizeof(value) for value in self.values)
+class PlainColumn(_Column):
+    """Column holding one value per row, for columns where nearly every value is distinct
+    and a dictionary would only add a lookup table and a codes array on top of the values.
+    values is indexed by row id, so every row is its own code."""
+    __slots__ = ('values', '_display', '_folded', '_ranks', '_kind')
+    encoding = 'plain'
+    def __init__(self, values: List[Any] = None):
+        self.values = values if values is not None else []
+        self._display = []
+        self._folded = []
+        self._ranks = None
+        self._kind = None
+    @classmethod
+    def from_dictionary(cls, column: DictionaryColumn) -> 'PlainColumn':
+        codes = column.codes
+        if len(codes) == len(column.values) and np.array_equal(codes, np.arange(len(codes))):
+            return cls(list(column.values))
+        values = column.values
+        return cls([values[code] for code in codes.tolist()])
+    def __len__(self) -> int:
+        return len(self.values)
+    def append(self, value):
+        self.values.append(value)
+    def extend(self, values: Iterable):
+        self.values.extend(values)
+    def flush(self):
+        pass
+    @property
+    def codes(self) -> np.ndarray:
+        return np.arange(len(self.values), dtype=np.int32)
+    def value(self, row_id: int) -> Any:
+        return self.values[row_id]
+    def display(self, row_id: int) -> str:
+        return self.display_values()[row_id]
+    def expand(self, per_value: np.ndarray) -> np.ndarray:
+        return per_value
+    def nbytes(self) -> int:
+        """Approximate memory held by the row values (the list itself plus each object)"""
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(value) for value in self.values)
+class Dataset:
+    """Column-oriented store for imported rows.
+    Row ids are positions in import order and never change, so views, selections
+    and sorting can refer to rows by id instead of copying them."""
+    def __init__(self, headers: Sequence = None):
+        self.headers = list(headers or [])
+        self.columns = [DictionaryColumn() for _ in self.headers]
+        self._row_count = 0
+        self._search_index = None
+        self._duplicate_index = None
+        self._address_checks = None
+        self._sort_orders = {}
+        self._sort_state = None
+    @classmethod
+    def from_rows(cls, headers: Sequence, rows: Iterable[Sequence]) -> 'Dataset':
+        dataset = cls(headers)
+        dataset.append_rows(rows)
+        return dataset
+    @classmethod
+    def from_columns(cls, headers: Sequence, columns: Sequence[DictionaryColumn]) -> 'Dataset':
+        """Build a dataset from already-encoded columns of equal length"""
+        dataset = cls(headers)
+        dataset.columns = list(columns)
+        dataset._row_count = len(columns[0]) if columns else 0
+        return dataset
+    @classmethod
+    def concat(cls, parts: Sequence['Dataset'], source_header: str = None,
+               sources: Sequence[str] = None) -> 'Dataset':
+        """Stack datasets under the union of their headers, in order of first appearance.
+        Headers match case-insensitively after trimming and columns a part lacks are filled
+        with None. Values are merged dictionary to dictionary, so each distinct value of a
+        part is looked up once. With source_header, a column holding sources[i] for the
+        rows of parts[i] is added last."""
+        headers = []
+        keys = []
+        part_indexes = []
+        for part in parts:
+            indexes = [None] * len(headers)
+            for column_index, header in enumerate(part.headers):
+                name = header
+                key = str(header).strip().casefold()
+                suffix = 0
+                while key in keys and indexes[keys.index(key)] is not None:
+                    # The part has two headers that fold to the same name; keep them apart like pandas does
+                    suffix += 1
+                    name = f'{header}.{suffix}'
+                    key = f'{str(header).strip().casefold()}.{suffix}'
+                if key not in keys:
+                    headers.append(name)
+                    keys.append(key)
+                    indexes.append(None)
+                indexes[keys.index(key)] = column_index
+            part_indexes.append(indexes)
+        columns = []
+        for target in range(len(headers)):
+            column = DictionaryColumn()
+            for part, indexes in zip(parts, part_indexes):
+                source_index = indexes[target] if target < len(indexes) else None
+                if source_index is None:
+                    column.extend_codes(np.full(len(part), column.code(None), dtype=np.int32))
+                else:
+                    source = part.columns[source_index]
+                    mapping = np.array([column.code(value) for value in source.values], dtype=np.int32)
+                    column.extend_codes(source.expand(mapping))
+            columns.append(column)
+        if source_header is not None:
+            name = source_header
+            suffix = 0
+            while name.strip().casefold() in keys:
+                suffix += 1
+                name = f'{source_header}.{suffix}'
+            headers.append(name)
+            source_column = DictionaryColumn.from_codes(
+                list(sources), np.repeat(np.arange(len(parts), dtype=np.int32), [len(part) for part in parts])
+            )
+            columns.append(source_column)
+        dataset = cls.from_columns(headers, columns)
+        dataset.finalize()
+        return dataset
+    def set_headers(self, headers: Sequence):
+        """Set the headers of an empty dataset (streaming importers learn them from the first chunk)"""
+        if self._row_count:
+            raise ValueError("Cannot change headers of a dataset that already holds rows")
+        self.headers = list(headers)
+        self.columns = [DictionaryColumn() for _ in self.headers]
+    def append_rows(self, rows: Iterable[Sequence]):
+        """Append row-shaped data, padding short rows with None and trimming long ones"""
+        width = len(self.headers)
+        rows = [row if len(row) == width else (list(row) + [None] * width)[:width] for row in rows]
+        if not rows or not width:
+            return
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+        self._row_count += len(rows)
+    def append_columns(self, columns: Sequence[Sequence]):
+        """Append column-shaped data, e.g. one list per DataFrame column of an import chunk"""
+        if not columns:
+            return
+        for column, values in zip(self.columns, columns):
+            column.extend(values)
+        self._row_count += len(columns[0])
+    def __len__(self) -> int:
+        return self._row_count
+    def __iter__(self):
+        for row_id in range(self._row_count):
+            yield self.row(row_id)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.view(np.arange(self._row_count)[index])
+        if index < 0:
+            index += self._row_count
+        if not 0 <= index < self._row_count:
+            raise IndexError("row id out of range")
+        return self.row(index)
+    def row(self, row_id: int) -> List[Any]:
+        return [column.value(row_id) for column in self.columns]
+    def value(self, row_id: int, column_index: int) -> Any:
+        return self.columns[column_index].value(row_id)
+    def display_value(self, row_id: int, column_index: int) -> str:
+        return self.columns[column_index].display(row_id)
+    def display_row(self, row_id: int) -> List[str]:
+        return [column.display(row_id) for column in self.columns]
+    def finalize(self):
+        """Pick the encoding of every column once an import is complete.
+        Columns where more than half of the rows hold distinct values are stored plain;
+        the rest stay dictionary-encoded."""
+        for index, column in enumerate(self.columns):
+            if isinstance(column, DictionaryColumn) and len(column.values) > PLAIN_CARDINALITY_RATIO * self._row_count:
+                self.columns[index] = PlainColumn.from_dictionary(column)
+    def memory_stats(self) -> List[Dict[str, Any]]:
+        """Inferred type, encoding, number of distinct values and approximate bytes per column"""
+        return [{
+            'column': header,
+            'kind': column.kind(),
+            'encoding': column.encoding,
+            'distinct': len(column.values) if column.encoding == 'dictionary' else len(set(map(_value_key, column.values))),
+            'bytes': column.nbytes()
+        } for header, column in zip(self.headers, self.columns)]
+    def sort_order(self, sort_keys: Sequence[Tuple[int, bool]]) -> np.ndarray:
+        """Every row id ordered by (column index, descending) keys, most significant first.
+        Ties keep import order and blank cells sort last in both directions. The order is
+        computed once per key list with np.lexsort and cached until the dataset changes."""
+        state = self._sort_state
+        if state is None or state[0] != self._row_count or len(state[1]) != len(self.columns) or any(
+                a is not b for a, b in zip(state[1], self.columns)):
+            self._sort_orders = {}
+            self._sort_state = (self._row_count, list(self.columns))
+        sort_keys = tuple((int(column_index), bool(descending)) for column_index, descending in sort_keys)
+        order = self._sort_orders.get(sort_keys)
+        if order is None:
+            row_keys = []
+            for column_index, descending in reversed(sort_keys):
+                column = self.columns[column_index]
+                ranks = column.sort_ranks().astype(np.int64)
+                blank = int(ranks.max()) + 1 if len(ranks) else 0
+                keys = np.where(ranks < 0, blank, blank - 1 - ranks if descending else ranks)
+                row_keys.append(column.expand(keys))
+            order = np.lexsort(row_keys) if row_keys else np.arange(self._row_count, dtype=np.int64)
+            order = self._sort_orders[sort_keys] = order.astype(np.int64)
+        return order
+    def search_index(self) -> SearchIndex:
+        """Trigram index over all columns, built on first use and again after rows are appended"""
+        index = self._search_index
+        if index is None or not index.is_current(self):
+            index = self._search_index = SearchIndex(self)
+        return index
+    def duplicate_index(self, column_index: int) -> DuplicateIndex:
+        """Duplicate-address index over one column, built on first use and again after rows are appended"""
+        index = self._duplicate_index
+        if index is None or index.column_index != column_index or not index.is_current(self):
+            index = self._duplicate_index = DuplicateIndex(self, column_index)
+        return index
+    def address_checks(self, column_index: int) -> AddressChecks:
+        """Address validation verdicts for one column, computed on first use and again after rows are appended"""
+        checks = self._address_checks
+        if checks is None or checks.column_index != column_index or not checks.is_current(self):
+            checks = self._address_checks = AddressChecks(self, column_index)
+        return checks
+    def search(self, text: str, row_ids=None, cancelled: Callable[[], bool] = None) -> np.ndarray:
+        """Row ids (of row_ids, or of all rows) with a cell containing text, case-insensitively.
+        Matching distinct values come from the search index and are spread to the rows through the codes.
+        cancelled is polled between steps; SearchCancelled is raised once it returns True."""
+        needle = text.lower()
+        row_ids = np.arange(self._row_count, dtype=np.int64) if row_ids is None else np.asarray(row_ids, dtype=np.int64)
+        if ' ' not in needle:
+            return row_ids[self.search_index().row_mask(needle, cancelled)[row_ids]]
+        # A space can match across the boundary between two cells, as the joined row text did.
+        # Each space-free piece still lies inside one cell, so the index narrows the rows to check.
+        for piece in needle.split(' '):
+            if piece:
+                row_ids = row_ids[self.search_index().row_mask(piece, cancelled)[row_ids]]
+        matches = []
+        for position, row_id in enumerate(row_ids.tolist()):
+            if cancelled is not None and not position % SEARCH_CANCEL_INTERVAL and cancelled():
+                raise SearchCancelled()
+            if needle in ' '.join(str(cell).lower() for cell in self.row(row_id) if cell is not None):
+                matches.append(row_id)
+        return np.array(matches, dtype=np.int64)
+    def view(self, row_ids=None) -> 'DatasetView':
+        """View over the given row ids (all rows in import order by default)"""
+        if row_ids is None:
+            row_ids = np.arange(self._row_count, dtype=np.int64)
+        return DatasetView(self, row_ids)
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns)
+class DatasetView:
+    """Ordered subset of a dataset, held as an array of row ids rather than row copies"""
+    __slots__ = ('dataset', 'row_ids')
+    def __init__(self, dataset: Dataset, row_ids):
+        self.dataset = dataset
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+    def __len__(self) -> int:
+        return len(self.row_ids)
+    def __iter__(self):
+        row = self.dataset.row
+        for row_id in self.row_ids.tolist():
+            yield row(row_id)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DatasetView(self.dataset, self.row_ids[index])
+        return self.dataset.row(int(self.row_ids[index]))
+    def row_id(self, index: int) -> int:
+        return int(self.row_ids[index])
+    def sorted(self, key, reverse: bool = False) -> 'DatasetView':
+        """New view with the same rows ordered by key(row_id)"""
+        return DatasetView(self.dataset, sorted(self.row_ids.tolist(), key=key, reverse=reverse))
+    def in_import_order(self) -> 'DatasetView':
+        return DatasetView(self.dataset, np.sort(self.row_ids))
+    def sorted_by_column(self, column_index: int, reverse: bool = False) -> 'DatasetView':
+        return self.sorted_by_columns([(column_index, reverse)])
+    def sorted_by_columns(self, sort_keys: Sequence[Tuple[int, bool]]) -> 'DatasetView':
+        """New view with the same rows in Dataset.sort_order(sort_keys) order.
+        The dataset-wide order is cached, so this only filters it down to the rows of the view."""
+        order = self.dataset.sort_order(sort_keys)
+        if len(self.row_ids) == len(order):
+            return DatasetView(self.dataset, order)
+        member = np.zeros(len(order), dtype=bool)
+        member[self.row_ids] = True
+        return DatasetView(self.dataset, order[member[order]])
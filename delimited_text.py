@@ -0,0 +1,160 @@
+import csv
+import mmap
+from bisect import bisect_right
+from typing import List, Iterator
+import numpy as np
+DELIMITERS = ',\t;|'
+SNIFF_SAMPLE_LINES = 50
+INDEX_BLOCK_SIZE = 16 * 1024 * 1024
+# The first block only has to cover the sniffing sample and the preview, so opening stays instant
+FIRST_INDEX_BLOCK_SIZE = 1024 * 1024
+# Bytes that are not ASCII whitespace: a line without one is blank and is left out of the index
+_TEXT_BYTES = np.ones(256, dtype=bool)
+_TEXT_BYTES[[9, 10, 11, 12, 13, 32]] = False
+class DelimitedTextFile:
+    """Memory-mapped delimited text file with a lazily built line-offset index.
+    Opening only maps the file and sniffs the dialect from a sample of lines; the
+    index (start offset and length of every line holding text) is extended block by
+    block as rows are requested, so any row is located and parsed on demand in O(1)
+    (a bisect over the handful of index blocks, then a direct array lookup), and
+    iter_rows streams every row without re-locating each one.
+    Quoted fields spanning several lines are not supported."""
+    def __init__(self, file_path: str, encoding: str = 'utf-8'):
+        self.file_path = file_path
+        self.encoding = encoding
+        self._handle = open(file_path, 'rb')
+        self._size = self._handle.seek(0, 2)
+        self._mapped = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b''
+        self._position = 3 if self._mapped[:3] == b'\xef\xbb\xbf' else 0
+        self._block_first_lines = []
+        self._blocks = []
+        self._indexed = 0
+        self.delimiter = None
+        self.dialect = None
+        self.headers = ['Content']
+        # Index line of the first data row: 1 after a sniffed header, else 0
+        self._data_start = 0
+        self._sniff()
+    def close(self):
+        if isinstance(self._mapped, mmap.mmap):
+            self._mapped.close()
+        self._handle.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    @property
+    def bytes_indexed(self) -> int:
+        return self._position
+    @property
+    def size(self) -> int:
+        return self._size
+    def _index_block(self) -> bool:
+        """Index the next block of lines; returns False once the whole file is indexed"""
+        if self._position >= self._size:
+            return False
+        start = self._position
+        stop = min(self._size, start + (INDEX_BLOCK_SIZE if self._blocks else FIRST_INDEX_BLOCK_SIZE))
+        if stop < self._size:
+            newline = self._mapped.rfind(b'\n', start, stop)
+            if newline < 0:
+                newline = self._mapped.find(b'\n', stop)
+            stop = newline + 1 if newline >= 0 else self._size
+        block = np.frombuffer(self._mapped, dtype=np.uint8, count=stop - start, offset=start)
+        newlines = np.flatnonzero(block == 10)
+        line_starts = np.concatenate(([0], newlines + 1))
+        line_ends = np.concatenate((newlines, [len(block)]))
+        carriage = line_ends > line_starts
+        carriage[carriage] = block[line_ends[carriage] - 1] == 13
+        line_ends = line_ends - carriage
+        keep = line_ends > line_starts
+        # Whitespace-only lines are dropped here, so line numbers and row numbers stay in step
+        keep[keep] = np.logical_or.reduceat(_TEXT_BYTES[block], line_starts[keep])
+        del block
+        self._block_first_lines.append(self._indexed)
+        self._blocks.append((line_starts[keep].astype(np.int64) + start, (line_ends - line_starts)[keep].astype(np.int32)))
+        self._indexed += int(keep.sum())
+        self._position = stop
+        return True
+    def _ensure_indexed(self, line_count: int = None):
+        while (line_count is None or self._indexed < line_count) and self._index_block():
+            pass
+    def _line(self, line_number: int) -> str:
+        self._ensure_indexed(line_number + 1)
+        if not 0 <= line_number < self._indexed:
+            raise IndexError("line out of range")
+        block = bisect_right(self._block_first_lines, line_number) - 1
+        starts, lengths = self._blocks[block]
+        offset = line_number - self._block_first_lines[block]
+        start = int(starts[offset])
+        return self._mapped[start:start + int(lengths[offset])].decode(self.encoding, errors='replace')
+    def _sniff(self):
+        """Pick delimiter and quoting from a multi-line sample instead of the first line alone"""
+        self._ensure_indexed(SNIFF_SAMPLE_LINES)
+        sample = [self._line(i) for i in range(min(self._indexed, SNIFF_SAMPLE_LINES))]
+        if not sample:
+            return
+        try:
+            dialect = csv.Sniffer().sniff('\n'.join(sample), delimiters=DELIMITERS)
+        except csv.Error:
+            dialect = None
+            best_count = 0
+            for delimiter in DELIMITERS:
+                counts = [line.count(delimiter) for line in sample]
+                if min(counts) > best_count:
+                    best_count = min(counts)
+                    dialect = type('SampledDialect', (csv.excel,), {'delimiter': delimiter})
+        if dialect is None or sample[0].count(dialect.delimiter) == 0:
+            return
+        dialect.skipinitialspace = True
+        self.dialect = dialect
+        self.delimiter = dialect.delimiter
+        self.headers = [h.strip() for h in self._parse(sample[0])]
+        self._data_start = 1
+    def _parse(self, line: str) -> List[str]:
+        return next(csv.reader([line], self.dialect), [])
+    def __len__(self) -> int:
+        """Number of data rows; indexes the rest of the file"""
+        self._ensure_indexed()
+        return self._indexed - self._data_start
+    def row(self, index: int) -> List[str]:
+        """Parse data row index (0 is the first row after the header), indexing only up to it"""
+        if index < 0:
+            raise IndexError("row out of range")
+        line = self._line(index + self._data_start)
+        if not self.dialect:
+            return [line.strip()]
+        values = [value.strip() for value in self._parse(line)]
+        width = len(self.headers)
+        if len(values) != width:
+            values = (values + [''] * width)[:width]
+        return values
+    def head(self, count: int) -> List[List[str]]:
+        """The first count data rows (fewer if the file is shorter), parsed on demand"""
+        self._ensure_indexed(count + self._data_start)
+        return [self.row(index) for index in range(min(count, self._indexed - self._data_start))]
+    def _iter_lines(self, first_line: int) -> Iterator[str]:
+        """Decoded lines from first_line on, indexing further blocks as needed"""
+        mapped = self._mapped
+        block = 0
+        while True:
+            if block >= len(self._blocks) and not self._index_block():
+                return
+            starts, lengths = self._blocks[block]
+            skip = max(0, first_line - self._block_first_lines[block])
+            for start, length in zip(starts[skip:].tolist(), lengths[skip:].tolist()):
+                yield mapped[start:start + length].decode(self.encoding, errors='replace')
+            block += 1
+    def iter_rows(self) -> Iterator[List[str]]:
+        """Parse all data rows in file order with a single csv reader; whitespace-only lines are skipped"""
+        if not self.dialect:
+            for line in self._iter_lines(self._data_start):
+                yield [line.strip()]
+            return
+        width = len(self.headers)
+        padding = [''] * width
+        for values in csv.reader(self._iter_lines(self._data_start), self.dialect):
+            values = [value.strip() for value in values]
+            if len(values) != width:
+                values = (values + padding)[:width]
+            yield values
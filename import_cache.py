@@ -0,0 +1,147 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import decimal
+import datetime
+from typing import Optional
+import numpy as np
+from dataset import Dataset, DictionaryColumn
+logger = logging.getLogger(__name__)
+CACHE_MAGIC = b'MMSCACHE'
+CACHE_VERSION = 2
+CACHE_SUFFIX = '.mmc'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), 'EmailSender_Cache')
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+FINGERPRINT_BYTES = 1024 * 1024
+def _encode_value(value):
+    """JSON-safe form of a cell value; types JSON has no literal for are tagged.
+    A value that cannot be restored with its exact type raises ValueError, so the
+    dataset is not cached rather than coming back different on a cache hit."""
+    cls = value.__class__
+    if value is None or cls in (str, bool, int, float):
+        return value
+    if cls is datetime.datetime:
+        return {'$dt': value.isoformat()}
+    if cls is datetime.date:
+        return {'$d': value.isoformat()}
+    if cls is datetime.time:
+        return {'$t': value.isoformat()}
+    if cls is datetime.timedelta:
+        return {'$td': [value.days, value.seconds, value.microseconds]}
+    if cls is decimal.Decimal:
+        return {'$dec': str(value)}
+    raise ValueError(f"{cls.__name__} cell values cannot be cached")
+def _aligned(offset: int) -> int:
+    return offset + (-offset % 8)
+def _decode_value(value):
+    if isinstance(value, dict):
+        if '$dt' in value:
+            return datetime.datetime.fromisoformat(value['$dt'])
+        if '$d' in value:
+            return datetime.date.fromisoformat(value['$d'])
+        if '$t' in value:
+            return datetime.time.fromisoformat(value['$t'])
+        if '$td' in value:
+            return datetime.timedelta(*value['$td'])
+        if '$dec' in value:
+            return decimal.Decimal(value['$dec'])
+    return value
+class ImportCache:
+    """On-disk cache of parsed imports.
+    Entries are keyed by file path, size, mtime, a hash of the head and tail of the content
+    and the import options, so looking up a multi-GB file reads two megabytes, not all of it.
+    Each entry is one file: magic, header length, JSON header (headers and distinct values
+    per column), then the raw int32 code arrays starting at the next 8-byte boundary.
+    The code arrays are memory-mapped on load instead of re-parsed.
+    Least recently used entries are evicted once the folder exceeds max_bytes."""
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+    @staticmethod
+    def content_hash(file_path: str, size: int) -> str:
+        """Hash of the first and last FINGERPRINT_BYTES of the file (all of it when smaller)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as handle:
+            digest.update(handle.read(FINGERPRINT_BYTES))
+            if size > FINGERPRINT_BYTES:
+                handle.seek(max(FINGERPRINT_BYTES, size - FINGERPRINT_BYTES))
+                digest.update(handle.read(FINGERPRINT_BYTES))
+        return digest.hexdigest()
+    def entry_path(self, file_path: str, options: str = '') -> str:
+        """Cache file for the current state of file_path imported with the given options"""
+        stat = os.stat(file_path)
+        key = '|'.join([
+            os.path.normcase(os.path.abspath(file_path)), str(stat.st_size), str(stat.st_mtime_ns),
+            self.content_hash(file_path, stat.st_size), options, str(CACHE_VERSION)
+        ])
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + CACHE_SUFFIX)
+    def load(self, path: str) -> Optional[Dataset]:
+        """Return the dataset stored in the cache entry at path, or None on a miss"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            mapped.close()
+            logger.warning(f"Ignoring corrupt import cache entry: {path}")
+            return None
+        header_length, = struct.unpack_from('<Q', mapped, len(CACHE_MAGIC))
+        header_start = len(CACHE_MAGIC) + 8
+        header = json.loads(bytes(mapped[header_start:header_start + header_length]).decode('utf-8'))
+        data_start = _aligned(header_start + header_length)
+        columns = []
+        for index, column in enumerate(header['columns']):
+            offset = data_start + index * header['rows'] * 4
+            codes = np.frombuffer(mapped, dtype='<i4', count=header['rows'], offset=offset)
+            columns.append(DictionaryColumn.from_codes([_decode_value(v) for v in column['values']], codes))
+        os.utime(path)
+        return Dataset.from_columns(header['headers'], columns)
+    def store(self, path: str, dataset: Dataset, file_path: str):
+        """Write dataset imported from file_path as the cache entry at path, then enforce the size cap"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        header = {
+            'source': os.path.abspath(file_path),
+            'headers': [str(h) for h in dataset.headers],
+            'rows': len(dataset),
+            'columns': [{'values': [_encode_value(v) for v in column.values]} for column in dataset.columns]
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as handle:
+            handle.write(CACHE_MAGIC)
+            handle.write(struct.pack('<Q', len(header_bytes)))
+            handle.write(header_bytes)
+            handle.write(b'\0' * (_aligned(handle.tell()) - handle.tell()))
+            for column in dataset.columns:
+                handle.write(np.ascontiguousarray(column.codes, dtype='<i4').tobytes())
+        os.replace(temp_path, path)
+        self.evict()
+    def evict(self):
+        """Delete least recently used entries until the cache folder fits in max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                # Entries still memory-mapped by this session cannot be removed on Windows
+                logger.info(f"Could not evict import cache entry {path}: {e}")
+    def clear(self):
+        max_bytes, self.max_bytes = self.max_bytes, 0
+        try:
+            self.evict()
+        finally:
+            self.max_bytes = max_bytes
@@ -1,20 +1,50 @@
 import os
 import sys
 import logging
-import re
 import subprocess
+import threading
 import time
-from typing import List, Dict, Any
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Dict, Any, Tuple, Callable, Iterable, Iterator
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QPushButton, QFileDialog, QLineEdit, QMessageBox, QTextEdit, 
-    QGroupBox, QTableWidget, QTableWidgetItem, QTabWidget, QComboBox, QProgressBar
+    QGroupBox, QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QTabWidget, QComboBox, QProgressBar,
+    QInputDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 from theme import var_theme, get_button_style, get_table_style
+from dataset import Dataset
+from search_index import SearchCancelled
+from recipients import RECIPIENT_EMAIL_HEADERS, find_email_column, normalize_email, DEDUPE_KEEP
+from template_engine import CompiledTemplate, FIELD_KINDS, cell_text, column_texts, compile_message, tokenize
+from column_mapping import ColumnMatcher, MappingMemory
+from column_formatting import ColumnFormatter, FormattedValueCache
+from data_table_model import DataTableModel
+from row_selection import RowSelection
+from import_cache import ImportCache
+from delimited_text import DelimitedTextFile
+from word_tables import WordTableReader
 logger = logging.getLogger(__name__)
+CSV_CHUNK_SIZE = 50000
+EXCEL_CHUNK_SIZE = 10000
+TXT_CHUNK_SIZE = 50000
+WORD_CHUNK_SIZE = 10000
+IMPORT_PREVIEW_ROWS = 200
+IMPORT_CANCEL_POLL_SECONDS = 0.1
+SOURCE_FILE_HEADER = 'Source File'
+FILTER_DEBOUNCE_MS = 150
+RENDER_CHUNK_ROWS = 500
 class FileImporter:
+    _import_cache = None
+    @staticmethod
+    def get_import_cache() -> ImportCache:
+        if FileImporter._import_cache is None:
+            FileImporter._import_cache = ImportCache()
+        return FileImporter._import_cache
     @staticmethod
     def detect_file_type(file_path: str) -> str:
         ext = os.path.splitext(file_path.lower())[1]
@@ -25,15 +55,91 @@ class FileImporter:
         }
         return type_map.get(ext, 'unknown')
     @staticmethod
-    def read_excel_file(file_path: str) -> Dict[str, Any]:
+    def list_excel_sheets(file_path: str) -> List[str]:
+        """Return the sheet names of a workbook by reading xl/workbook.xml only, without parsing any sheet"""
+        import zipfile
+        import xml.etree.ElementTree as ET
+        with zipfile.ZipFile(file_path) as archive:
+            root = ET.fromstring(archive.read('xl/workbook.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        return [sheet.get('name') for sheet in root.iter(f'{namespace}sheet')]
+    @staticmethod
+    def excel_headers(header_row) -> List[str]:
+        """Turn the first sheet row into unique column names, dropping trailing empty cells"""
+        cells = list(header_row)
+        while cells and (cells[-1] is None or str(cells[-1]).strip() == ''):
+            cells.pop()
+        headers = []
+        seen = {}
+        for i, cell in enumerate(cells):
+            name = str(cell).strip() if cell is not None and str(cell).strip() else f'Unnamed: {i}'
+            if name in seen:
+                seen[name] += 1
+                name = f'{name}.{seen[name]}'
+            else:
+                seen[name] = 0
+            headers.append(name)
+        return headers
+    @staticmethod
+    def read_excel_file(file_path: str, dataset: Dataset = None, progress_callback=None,
+                        sheet_name: str = None, chunk_size: int = EXCEL_CHUNK_SIZE) -> Dict[str, Any]:
+        """Stream one worksheet through openpyxl's read-only reader into dataset.
+        Only the requested sheet (the first one by default) is parsed. As with pandas, empty
+        cells become NaN and empty rows are kept unless they trail the data."""
         try:
-            import pandas as pd
-            df = pd.read_excel(file_path, engine='openpyxl')
+            import openpyxl
+            dataset = dataset if dataset is not None else Dataset()
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                worksheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+                expected_rows = max((worksheet.max_row or 0) - 1, 0)
+                rows = worksheet.iter_rows(values_only=True)
+                header_row = next(rows, None)
+                headers = FileImporter.excel_headers(header_row or [])
+                dataset.set_headers(headers)
+                width = len(headers)
+                missing = float('nan')
+                blank_row = (missing,) * width
+                blank_rows = 0
+                rows_loaded = 0
+                chunk = []
+                start_time = time.perf_counter()
+                for row in rows:
+                    row = row[:width]
+                    if None in row:
+                        if all(value is None for value in row):
+                            # Held back until a row with data follows, so trailing empty rows are dropped
+                            blank_rows += 1
+                            continue
+                        row = tuple(missing if value is None else value for value in row)
+                    if len(row) < width:
+                        row += blank_row[len(row):]
+                    if blank_rows:
+                        chunk.extend([blank_row] * blank_rows)
+                        blank_rows = 0
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        dataset.append_rows(chunk)
+                        rows_loaded += len(chunk)
+                        chunk = []
+                        if progress_callback:
+                            elapsed = time.perf_counter() - start_time
+                            percent = min(100, int(rows_loaded * 100 / expected_rows)) if expected_rows else 0
+                            progress_callback(headers, rows_loaded, percent, rows_loaded / elapsed if elapsed > 0 else 0.0)
+                dataset.append_rows(chunk)
+                rows_loaded += len(chunk)
+                if progress_callback:
+                    elapsed = time.perf_counter() - start_time
+                    progress_callback(headers, rows_loaded, 100, rows_loaded / elapsed if elapsed > 0 else 0.0)
+                sheet_title = worksheet.title
+            finally:
+                workbook.close()
+            logger.info(f"Excel import: {rows_loaded} rows from sheet '{sheet_title}' in {time.perf_counter() - start_time:.2f}s")
             return {
-                'headers': list(df.columns),
-                'data': df.values.tolist(),
+                'headers': headers,
+                'data': dataset,
                 'success': True,
-                'message': f'Excel file loaded successfully. {len(df)} rows found.'
+                'message': f'Excel file loaded successfully. {rows_loaded} rows found in sheet "{sheet_title}".'
             }
         except Exception as e:
             return {
@@ -41,37 +147,78 @@ class FileImporter:
                 'message': f'Error reading Excel file: {str(e)}'
             }
     @staticmethod
-    def read_word_file(file_path: str) -> Dict[str, Any]:
+    def list_word_tables(file_path: str) -> List[Dict[str, Any]]:
+        """Return index, headers and data row count of every table in a .docx"""
+        with WordTableReader(file_path) as reader:
+            return reader.tables()
+    @staticmethod
+    def read_word_file(file_path: str, dataset: Dataset = None, progress_callback=None,
+                       tables: List[int] = None, chunk_size: int = WORD_CHUNK_SIZE) -> Dict[str, Any]:
+        """Read Word tables by streaming word/document.xml.
+        tables lists the table indexes to import; tables whose headers differ from the first
+        one imported are skipped. By default the first table with data rows is imported."""
         try:
-            import docx
-            doc = docx.Document(file_path)
-            tables_data = []
-            for table in doc.tables:
-                table_data = []
-                headers = []
-                for i, row in enumerate(table.rows):
-                    row_data = [cell.text.strip() for cell in row.cells]
-                    if i == 0:
-                        headers = row_data
-                    else:
-                        table_data.append(row_data)
-                if headers and table_data:
-                    tables_data.append({'headers': headers, 'data': table_data})
-            if tables_data:
+            dataset = dataset if dataset is not None else Dataset()
+            wanted = set(tables) if tables else None
+            headers = None
+            table_headers = {}
+            found = set()
+            skipped = set()
+            rows_loaded = 0
+            chunk = []
+            start_time = time.perf_counter()
+            with WordTableReader(file_path) as reader:
+                for table_index, row_number, cells in reader.iter_table_rows():
+                    row_data = [cell.strip() for cell in cells]
+                    if row_number == 0:
+                        table_headers[table_index] = row_data
+                        continue
+                    found.add(table_index)
+                    if row_number == 1:
+                        if wanted is None and headers is None:
+                            wanted = {table_index}
+                        if wanted is not None and table_index in wanted:
+                            if headers is None:
+                                headers = table_headers[table_index]
+                                dataset.set_headers(headers)
+                            elif table_headers[table_index] != headers:
+                                skipped.add(table_index)
+                    if wanted is None or table_index not in wanted or table_index in skipped:
+                        continue
+                    chunk.append(row_data)
+                    if len(chunk) >= chunk_size:
+                        dataset.append_rows(chunk)
+                        rows_loaded += len(chunk)
+                        chunk = []
+                        if progress_callback:
+                            elapsed = time.perf_counter() - start_time
+                            percent = min(100, int(reader.bytes_read * 100 / (reader.size or 1)))
+                            progress_callback(headers, rows_loaded, percent, rows_loaded / elapsed if elapsed > 0 else 0.0)
+                dataset.append_rows(chunk)
+                rows_loaded += len(chunk)
+                paragraphs = reader.paragraphs
+            if headers is not None:
+                message = f'Word file loaded successfully. {len(found)} tables found, {rows_loaded} rows imported.'
+                if skipped:
+                    message += f' {len(skipped)} tables skipped because their headers differ.'
                 return {
-                    'headers': tables_data[0]['headers'],
-                    'data': tables_data[0]['data'],
+                    'headers': headers,
+                    'data': dataset,
                     'success': True,
-                    'message': f'Word file loaded successfully. {len(tables_data)} tables found.'
+                    'message': message
+                }
+            elif tables:
+                return {
+                    'headers': [], 'data': [], 'success': False,
+                    'message': 'The selected Word tables contain no data rows.'
                 }
             else:
-                text_lines = []
-                for paragraph in doc.paragraphs:
-                    if paragraph.text.strip():
-                        text_lines.append([paragraph.text.strip()])
+                text_lines = [[paragraph.strip()] for paragraph in paragraphs if paragraph.strip()]
+                dataset.set_headers(['Content'])
+                dataset.append_rows(text_lines)
                 return {
                     'headers': ['Content'],
-                    'data': text_lines,
+                    'data': dataset,
                     'success': True,
                     'message': f'Word file loaded as text. {len(text_lines)} lines found.'
                 }
@@ -81,15 +228,36 @@ class FileImporter:
                 'message': f'Error reading Word file: {str(e)}'
             }
     @staticmethod
-    def read_csv_file(file_path: str) -> Dict[str, Any]:
+    def read_csv_file(file_path: str, dataset: Dataset = None, progress_callback=None,
+                      chunk_size: int = CSV_CHUNK_SIZE) -> Dict[str, Any]:
+        """Stream a CSV file in fixed-size chunks, appending each chunk to dataset.
+        progress_callback(headers, rows_loaded, percent, rows_per_sec) is called after every chunk."""
         try:
             import pandas as pd
-            df = pd.read_csv(file_path)
+            dataset = dataset if dataset is not None else Dataset()
+            headers = []
+            rows_loaded = 0
+            file_size = os.path.getsize(file_path) or 1
+            start_time = time.perf_counter()
+            with open(file_path, 'rb') as handle:
+                for chunk in pd.read_csv(handle, chunksize=chunk_size):
+                    if not headers:
+                        headers = list(chunk.columns)
+                        dataset.set_headers(headers)
+                    dataset.append_columns([chunk.iloc[:, i].tolist() for i in range(chunk.shape[1])])
+                    rows_loaded += len(chunk)
+                    if progress_callback:
+                        elapsed = time.perf_counter() - start_time
+                        percent = min(100, int(handle.tell() * 100 / file_size))
+                        rows_per_sec = rows_loaded / elapsed if elapsed > 0 else 0.0
+                        progress_callback(headers, rows_loaded, percent, rows_per_sec)
+            elapsed = time.perf_counter() - start_time
+            logger.info(f"CSV import: {rows_loaded} rows in {elapsed:.2f}s")
             return {
-                'headers': list(df.columns),
-                'data': df.values.tolist(),
+                'headers': headers,
+                'data': dataset,
                 'success': True,
-                'message': f'CSV file loaded successfully. {len(df)} rows found.'
+                'message': f'CSV file loaded successfully. {rows_loaded} rows found.'
             }
         except Exception as e:
             return {
@@ -97,41 +265,54 @@ class FileImporter:
                 'message': f'Error reading CSV file: {str(e)}'
             }
     @staticmethod
-    def read_txt_file(file_path: str) -> Dict[str, Any]:
+    def read_txt_file(file_path: str, dataset: Dataset = None, progress_callback=None,
+                      chunk_size: int = TXT_CHUNK_SIZE, preview_callback=None) -> Dict[str, Any]:
+        """Read a delimited text file through a memory-mapped line index.
+        The delimiter and quoting are sniffed from a sample of lines. preview_callback(headers, rows)
+        gets the first IMPORT_PREVIEW_ROWS rows, parsed on demand right after opening; then all
+        rows are parsed in one streaming pass and appended to dataset in chunks."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                lines = [line.strip() for line in file.readlines() if line.strip()]
-            if not lines:
+            dataset = dataset if dataset is not None else Dataset()
+            with DelimitedTextFile(file_path) as text_file:
+                headers = text_file.headers
+                if preview_callback:
+                    preview_callback(headers, text_file.head(IMPORT_PREVIEW_ROWS))
+                dataset.set_headers(headers)
+                rows_loaded = 0
+                chunk = []
+                start_time = time.perf_counter()
+                for row in text_file.iter_rows():
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        dataset.append_rows(chunk)
+                        rows_loaded += len(chunk)
+                        chunk = []
+                        if progress_callback:
+                            elapsed = time.perf_counter() - start_time
+                            percent = min(100, int(text_file.bytes_indexed * 100 / (text_file.size or 1)))
+                            progress_callback(headers, rows_loaded, percent, rows_loaded / elapsed if elapsed > 0 else 0.0)
+                dataset.append_rows(chunk)
+                rows_loaded += len(chunk)
+                if progress_callback:
+                    elapsed = time.perf_counter() - start_time
+                    progress_callback(headers, rows_loaded, 100, rows_loaded / elapsed if elapsed > 0 else 0.0)
+                delimiter = text_file.delimiter
+            if not rows_loaded and not delimiter:
                 return {
-                    'headers': ['Content'], 'data': [], 'success': True,
+                    'headers': ['Content'], 'data': dataset, 'success': True,
                     'message': 'Text file is empty.'
                 }
-            delimiters = [',', '\t', ';', '|']
-            best_delimiter = ','
-            max_columns = 1
-            for delimiter in delimiters:
-                columns = len(lines[0].split(delimiter))
-                if columns > max_columns:
-                    max_columns = columns
-                    best_delimiter = delimiter
-            if max_columns > 1:
-                headers = [h.strip() for h in lines[0].split(best_delimiter)]
-                data = []
-                for line in lines[1:]:
-                    row_data = [d.strip() for d in line.split(best_delimiter)]
-                    while len(row_data) < len(headers):
-                        row_data.append('')
-                    data.append(row_data[:len(headers)])
+            if delimiter:
                 return {
-                    'headers': headers, 'data': data, 'success': True,
-                    'message': f'Text file loaded. {len(data)} rows with delimiter "{best_delimiter}".'
+                    'headers': headers, 'data': dataset, 'success': True,
+                    'message': f'Text file loaded. {rows_loaded} rows with delimiter "{delimiter}".'
                 }
             else:
                 return {
                     'headers': ['Content'],
-                    'data': [[line] for line in lines],
+                    'data': dataset,
                     'success': True,
-                    'message': f'Text file loaded as single column. {len(lines)} lines found.'
+                    'message': f'Text file loaded as single column. {rows_loaded} lines found.'
                 }
         except Exception as e:
             return {
@@ -139,12 +320,138 @@ class FileImporter:
                 'message': f'Error reading text file: {str(e)}'
             }
     @staticmethod
-    def import_file(file_path: str) -> Dict[str, Any]:
+    def import_file(file_path: str, dataset: Dataset = None, progress_callback=None,
+                    sheet_name: str = None, use_cache: bool = True, tables: List[int] = None,
+                    preview_callback=None) -> Dict[str, Any]:
+        """Import a file, serving unchanged files from the on-disk import cache.
+        preview_callback(headers, rows) is offered the first rows early by readers that can
+        parse them on demand (text files)."""
         if not os.path.exists(file_path):
             return {
                 'headers': [], 'data': [], 'success': False,
                 'message': 'File does not exist.'
             }
+        cache_entry = None
+        if use_cache and FileImporter.detect_file_type(file_path) != 'unknown':
+            try:
+                cache = FileImporter.get_import_cache()
+                options = f'sheet={sheet_name or ""}'
+                if tables:
+                    options += f'|tables={",".join(str(t) for t in tables)}'
+                cache_entry = cache.entry_path(file_path, options)
+                cached = cache.load(cache_entry)
+                if cached is not None:
+                    logger.info(f"Import cache hit for {file_path}")
+                    cached.finalize()
+                    return {
+                        'headers': cached.headers,
+                        'data': cached,
+                        'success': True,
+                        'message': f'File loaded from import cache. {len(cached)} rows found.'
+                    }
+            except Exception as e:
+                logger.warning(f"Import cache unavailable: {e}")
+                cache_entry = None
+        result = FileImporter._import_uncached(file_path, dataset, progress_callback, sheet_name, tables, preview_callback)
+        if result['success'] and isinstance(result['data'], Dataset):
+            result['data'].finalize()
+            if cache_entry:
+                try:
+                    FileImporter.get_import_cache().store(cache_entry, result['data'], file_path)
+                except Exception as e:
+                    logger.warning(f"Could not write import cache entry: {e}")
+        return result
+    @staticmethod
+    def source_label(file_path: str, sheet_name: str = None) -> str:
+        name = os.path.basename(file_path)
+        return f'{name} [{sheet_name}]' if sheet_name else name
+    @staticmethod
+    def import_files(sources: List[Tuple[str, str]], progress_callback=None, max_workers: int = None,
+                     use_cache: bool = True, cancelled=None) -> Dict[str, Any]:
+        """Import several (file path, sheet name) sources in a process pool and merge them into one dataset.
+        Headers are unioned by name and a Source File column records where each row came from.
+        Sources that fail are left out and listed in the message. cancelled() is polled while
+        the pool works; once it returns True the worker processes are terminated and
+        ImportCancelled is raised."""
+        if not sources:
+            return {
+                'headers': [], 'data': [], 'success': False,
+                'message': 'No files selected.'
+            }
+        results = [None] * len(sources)
+        rows_loaded = 0
+        start_time = time.perf_counter()
+        def report(done):
+            if progress_callback:
+                elapsed = time.perf_counter() - start_time
+                progress_callback(None, rows_loaded, int(done * 100 / len(sources)), rows_loaded / elapsed if elapsed > 0 else 0.0)
+        workers = min(len(sources), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            for index, (file_path, sheet_name) in enumerate(sources):
+                if cancelled is not None and cancelled():
+                    raise ImportCancelled()
+                results[index] = FileImporter.import_file(file_path, sheet_name=sheet_name, use_cache=use_cache)
+                if results[index]['success']:
+                    rows_loaded += len(results[index]['data'])
+                report(index + 1)
+        else:
+            # spawn rather than fork: the GUI process has Qt and worker threads running
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            try:
+                futures = {pool.submit(_import_source, file_path, sheet_name, use_cache): index
+                           for index, (file_path, sheet_name) in enumerate(sources)}
+                pending = set(futures)
+                done = 0
+                while pending:
+                    finished, pending = wait(pending, timeout=IMPORT_CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    if cancelled is not None and cancelled():
+                        # Running children would keep parsing their files until done; stop them now
+                        for process in list((pool._processes or {}).values()):
+                            process.terminate()
+                        raise ImportCancelled()
+                    for future in finished:
+                        done += 1
+                        index = futures[future]
+                        try:
+                            results[index] = future.result()
+                        except Exception as e:
+                            results[index] = {
+                                'headers': [], 'data': [], 'success': False,
+                                'message': f'An unexpected error occurred: {str(e)}'
+                            }
+                        if results[index]['success']:
+                            rows_loaded += len(results[index]['data'])
+                        report(done)
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+        parts = []
+        labels = []
+        failures = []
+        for (file_path, sheet_name), result in zip(sources, results):
+            label = FileImporter.source_label(file_path, sheet_name)
+            if result['success'] and isinstance(result['data'], Dataset):
+                parts.append(result['data'])
+                labels.append(label)
+            else:
+                failures.append(f'{label}: {result["message"]}')
+        if not parts:
+            return {
+                'headers': [], 'data': [], 'success': False,
+                'message': 'No file could be imported.\n\n' + '\n'.join(failures)
+            }
+        dataset = Dataset.concat(parts, SOURCE_FILE_HEADER, labels)
+        message = f'{len(parts)} sources merged. {len(dataset)} rows found with {len(dataset.headers) - 1} columns.'
+        if failures:
+            message += f'\n\n{len(failures)} sources could not be imported:\n' + '\n'.join(failures)
+        return {
+            'headers': dataset.headers,
+            'data': dataset,
+            'success': True,
+            'message': message
+        }
+    @staticmethod
+    def _import_uncached(file_path: str, dataset: Dataset = None, progress_callback=None,
+                         sheet_name: str = None, tables: List[int] = None, preview_callback=None) -> Dict[str, Any]:
         file_type = FileImporter.detect_file_type(file_path)
         importers = {
             'excel': FileImporter.read_excel_file,
@@ -153,8 +460,14 @@ class FileImporter:
             'txt': FileImporter.read_txt_file
         }
         importer = importers.get(file_type)
-        if importer:
-            return importer(file_path)
+        if file_type == 'excel':
+            return importer(file_path, dataset, progress_callback, sheet_name)
+        if file_type == 'word':
+            return importer(file_path, dataset, progress_callback, tables)
+        if file_type == 'txt':
+            return importer(file_path, dataset, progress_callback, preview_callback=preview_callback)
+        if file_type == 'csv':
+            return importer(file_path, dataset, progress_callback)
         else:
             return {
                 'headers': [], 'data': [], 'success': False,
@@ -162,56 +475,29 @@ class FileImporter:
             }
 class PlaceholderExtractor:
     @staticmethod
-    def extract_placeholders(text: str) -> List[str]:
-        placeholders = set()
-        patterns = [
-            r'\{([^}]+)\}',        
-            r'<([^>]+)>',          
-            r'\[\[([^\]]+)\]\]',   
-            r'<<([^>]+)>>',        
-            r'\(([^)]+)\)',        
-            r'\{\{([^}]+)\}\}',    
-            r'\[([^\]]+)\]',       
-        ]
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                match = match.strip().upper()
-                if match and any(c.isalpha() for c in match):
-                    standardized = '{' + match + '}'
-                    placeholders.add(standardized)
-        return sorted(list(placeholders))
+    def extract_placeholders(text: str, headers: List[str] = ()) -> List[str]:
+        """Distinct placeholder names of text, standardized as {NAME}, from one tokenizer pass.
+        Names of headers are recognized even where they look like HTML, e.g. <Date/Time>."""
+        return sorted({'{' + placeholder.name.upper() + '}' for placeholder in tokenize(text, headers)})
     @staticmethod
-    def suggest_mappings(placeholders: List[str], headers: List[str]) -> Dict[str, str]:
-        suggestions = {}
-        for placeholder in placeholders:
-            placeholder = placeholder.strip('{}').upper()
-            best_match = None
-            best_score = 0
-            for header in headers:
-                header = header.upper()
-                if placeholder == header:
-                    best_match = header
-                    best_score = 100
-                    break
-                if placeholder in header or header in placeholder:
-                    score = 80
-                    if score > best_score:
-                        best_match = header
-                        best_score = score
-                common_mappings = {
-                    ('NAME', 'FULLNAME', 'FULL_NAME'): ('NAME', 'PERSON', 'USER'),
-                    ('EMAIL', 'MAIL', 'E_MAIL'): ('EMAIL', 'MAIL', '@')
-                }
-                for placeholder_group, header_keywords in common_mappings.items():
-                    if placeholder in placeholder_group:
-                        if any(keyword in header for keyword in header_keywords):
-                            if 60 > best_score:
-                                best_match = header
-                                best_score = 60
-            if best_match:
-                suggestions[placeholder] = best_match
-        return suggestions
+    def suggest_mappings(placeholders: List[str], headers: List[str], memory: MappingMemory = None) -> Dict[str, str]:
+        """Best column per placeholder, keyed by placeholder as given ({NAME}); see ColumnMatcher"""
+        return ColumnMatcher(headers, memory).suggest(placeholders)
+class RecipientStream:
+    """Rendered recipients for EmailSender.send_emails, produced chunk_rows rows at a time.
+    Iterating renders the next chunk only when the previous one has been sent, so memory holds
+    one chunk of messages however large the campaign, and the first email goes out after one
+    chunk is rendered instead of all of them. len() is the number of rows to send."""
+    def __init__(self, row_ids: np.ndarray, render_chunk: Callable[[np.ndarray], List[Dict[str, Any]]],
+                 chunk_rows: int = RENDER_CHUNK_ROWS):
+        self.row_ids = row_ids
+        self.render_chunk = render_chunk
+        self.chunk_rows = chunk_rows
+    def __len__(self) -> int:
+        return len(self.row_ids)
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(self.row_ids), self.chunk_rows):
+            yield from self.render_chunk(self.row_ids[start:start + self.chunk_rows])
 class EmailSender:
     _outlook_instance = None
     @staticmethod
@@ -275,41 +561,38 @@ class EmailSender:
             logger.error(f"Error starting Outlook: {e}")
             return False
     @staticmethod
-    def get_email_accounts() -> List[Dict[str, Any]]:
-        """Extract email accounts from Microsoft Outlook using pywin32"""
+    def _dispatch_outlook():
+        import win32com.client
+        return win32com.client.Dispatch("Outlook.Application")
+    @staticmethod
+    def discover_email_accounts(outlook_factory=None) -> Dict[str, Any]:
+        """Read the SMTP accounts configured in Outlook without touching the UI, so it can run in a worker thread.
+        Returns plain {'email', 'name'} dicts - COM objects are bound to the thread that created them.
+        outlook_factory returns an Outlook.Application object (win32com Dispatch by default)."""
         accounts = []
         try:
             logger.info("Loading Outlook email accounts via pywin32...")
-            logger.info("Connecting to Outlook silently (COM will start it in background if needed)...")
-            try:
-                import win32com.client
-                logger.info("win32com.client imported successfully")
-            except ImportError as e:
-                logger.error(f"CRITICAL: Failed to import win32com.client: {e}")
-                logger.error("Install pywin32: pip install pywin32")
-                QMessageBox.critical(None, "Missing Dependency", 
-                    "pywin32 package is required!\n\nInstall it with: pip install pywin32")
-                return accounts
-            logger.info("Connecting to Outlook Application...")
-            outlook = None
-            if EmailSender._outlook_instance is not None:
+            if outlook_factory is None:
                 try:
-                    _ = EmailSender._outlook_instance.Version
-                    logger.info("✓ Reusing existing Outlook instance")
-                    outlook = EmailSender._outlook_instance
-                except:
-                    logger.warning("Cached Outlook instance is invalid, creating new connection")
-                    EmailSender._outlook_instance = None
-            if EmailSender._outlook_instance is None:
-                try:
-                    outlook = win32com.client.Dispatch("Outlook.Application")
-                    _ = outlook.Version
-                    logger.info(f"Successfully connected to Outlook (version {outlook.Version})")
-                    EmailSender._outlook_instance = outlook
-                    logger.info("✓ Outlook instance cached for reuse")
-                except Exception as e:
-                    logger.error(f"Failed to connect to Outlook: {e}")
-                    error_msg = (
+                    import win32com.client
+                    logger.info("win32com.client imported successfully")
+                except ImportError as e:
+                    logger.error(f"CRITICAL: Failed to import win32com.client: {e}")
+                    logger.error("Install pywin32: pip install pywin32")
+                    return {
+                        'accounts': accounts, 'success': False, 'title': "Missing Dependency",
+                        'message': "pywin32 package is required!\n\nInstall it with: pip install pywin32"
+                    }
+                outlook_factory = EmailSender._dispatch_outlook
+            logger.info("Connecting to Outlook Application...")
+            try:
+                outlook = outlook_factory()
+                logger.info(f"Successfully connected to Outlook (version {outlook.Version})")
+            except Exception as e:
+                logger.error(f"Failed to connect to Outlook: {e}")
+                return {
+                    'accounts': accounts, 'success': False, 'title': "Outlook Connection Error",
+                    'message': (
                         f"Could not connect to Microsoft Outlook.\n\n"
                         f"Error: {str(e)}\n\n"
                         "Solutions:\n"
@@ -318,72 +601,77 @@ class EmailSender:
                         "3. Run this program as Administrator (right-click → Run as administrator)\n"
                         "4. Close ALL Outlook windows and restart this program"
                     )
-                    QMessageBox.critical(None, "Outlook Connection Error", error_msg)
-                    return accounts
-            QApplication.processEvents()
-            try:
-                namespace = outlook.GetNamespace("MAPI")
-                logger.info("Connected to MAPI namespace")
-            except Exception as e:
-                logger.error(f"Failed to get MAPI namespace: {e}")
-                return accounts
+                }
             try:
                 outlook_accounts = outlook.Session.Accounts
                 account_count = outlook_accounts.Count
                 logger.info(f"Found {account_count} Outlook account(s)")
-                if account_count == 0:
-                    logger.warning("No Outlook accounts configured!")
-                    QMessageBox.warning(None, "No Accounts", 
-                        "No email accounts found in Outlook.\n\n"
-                        "Please configure at least one email account in Outlook.")
-                    return accounts
             except Exception as e:
                 logger.error(f"Failed to access Outlook accounts: {e}")
-                return accounts
+                return {
+                    'accounts': accounts, 'success': False, 'title': "Error",
+                    'message': f"Could not read the Outlook accounts:\n\n{str(e)}"
+                }
+            if account_count == 0:
+                logger.warning("No Outlook accounts configured!")
+                return {
+                    'accounts': accounts, 'success': False, 'title': "No Accounts",
+                    'message': "No email accounts found in Outlook.\n\n"
+                               "Please configure at least one email account in Outlook."
+                }
             for i in range(1, account_count + 1):
                 try:
                     account = outlook_accounts.Item(i)
                     account_name = account.DisplayName
-                    try:
-                        email_address = account.SmtpAddress
-                        if email_address and '@' in email_address:
-                            list_index = len(accounts)  
-                            accounts.append({
-                                'email': email_address,
-                                'account_object': account
-                            })
-                            logger.info(f"✓ Outlook Position {i} → List Index[{list_index}]: {email_address} (Name: {account_name})")
-                        else:
-                            logger.warning(f"✗ Account {i}: No valid SMTP address")
-                    except Exception as e:
-                        logger.warning(f"✗ Account {i}: Error: {e}")
-                    QApplication.processEvents()
+                    email_address = account.SmtpAddress
+                    if email_address and '@' in email_address:
+                        list_index = len(accounts)
+                        accounts.append({'email': str(email_address), 'name': str(account_name)})
+                        logger.info(f"✓ Outlook Position {i} → List Index[{list_index}]: {email_address} (Name: {account_name})")
+                    else:
+                        logger.warning(f"✗ Account {i}: No valid SMTP address")
                 except Exception as e:
                     logger.warning(f"Error processing account {i}: {e}")
         except Exception as e:
             logger.error(f"Critical error loading email accounts: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            QMessageBox.critical(None, "Error", 
-                f"Error loading email accounts:\n\n{str(e)}\n\n"
-                "Please ensure:\n"
-                "1. Microsoft Outlook is installed\n"
-                "2. pywin32 is installed (pip install pywin32)\n"
-                "3. Outlook has configured email accounts")
+            return {
+                'accounts': accounts, 'success': False, 'title': "Error",
+                'message': (
+                    f"Error loading email accounts:\n\n{str(e)}\n\n"
+                    "Please ensure:\n"
+                    "1. Microsoft Outlook is installed\n"
+                    "2. pywin32 is installed (pip install pywin32)\n"
+                    "3. Outlook has configured email accounts"
+                )
+            }
         if len(accounts) == 0:
             logger.warning("No email accounts loaded!")
-            print(f"\n⚠ WARNING: No email accounts found in Outlook!\n")
         else:
             logger.info(f"Successfully loaded {len(accounts)} email account(s)")
-            print(f"\n✓ Successfully loaded {len(accounts)} email account(s):")
             for i, acc in enumerate(accounts, 1):
-                print(f"  {i}. {acc['email']}")
-            print()
-        return accounts
+                logger.info(f"  {i}. {acc['email']}")
+        return {'accounts': accounts, 'success': True, 'title': "", 'message': f"Loaded {len(accounts)} email account(s)"}
     @staticmethod
-    def send_emails(recipients: List[Dict], subject: str, template: str, 
-                   account: Dict, attachments: List[str] = None) -> Dict[str, Any]:
-        """Send emails using Microsoft Outlook via pywin32"""
+    def get_email_accounts() -> List[Dict[str, Any]]:
+        """Extract email accounts from Microsoft Outlook, reporting problems in a message box"""
+        result = EmailSender.discover_email_accounts()
+        if not result['success']:
+            QMessageBox.critical(None, result['title'], result['message'])
+        return result['accounts']
+    @staticmethod
+    def send_emails(recipients: Iterable[Dict], subject: str, template: str, 
+                   account: Dict, attachments: List[str] = None, skip_duplicates: bool = True) -> Dict[str, Any]:
+        """Send emails using Microsoft Outlook via pywin32.
+        recipients may be a list or any iterable with len(), such as a RecipientStream; it is
+        iterated once, so a stream renders each message just before it is sent.
+        With skip_duplicates, a recipient whose address (trimmed, case-insensitive) was already
+        sent to in this batch is skipped instead of mailed again."""
+        sent_count = 0
+        failed_count = 0
+        skipped_count = 0
+        attempted = 0
         try:
             import win32com.client
             sender_email = account.get('email', None)
@@ -455,10 +743,10 @@ class EmailSender:
                     'sent': 0,
                     'failed': len(recipients)
                 }
-            sent_count = 0
-            failed_count = 0
             failed_recipients = []
+            sent_addresses = set()
             for i, recipient_data in enumerate(recipients, 1):
+                attempted = i
                 try:
                     recipient_email = None
                     for field in ['EMAIL', 'Email', 'email', 'E-mail', 'E-Mail', 'Mail', 'MAIL']:
@@ -469,6 +757,13 @@ class EmailSender:
                         failed_count += 1
                         failed_recipients.append(f"Recipient {i}: No valid email")
                         continue
+                    if skip_duplicates:
+                        address_key = normalize_email(recipient_email)
+                        if address_key in sent_addresses:
+                            skipped_count += 1
+                            logger.info(f"Email {i}: Skipped, {recipient_email} already received this email")
+                            continue
+                        sent_addresses.add(address_key)
                     mail_item = outlook.CreateItem(0)  
                     mail_item.SendUsingAccount = account_object
                     try:
@@ -520,53 +815,180 @@ class EmailSender:
                     failed_recipients.append(error_msg)
             return {
                 'success': failed_count == 0,
-                'message': f'Sent {sent_count} emails' + (f', {failed_count} failed' if failed_count > 0 else ''),
+                'message': f'Sent {sent_count} emails' + (f', {failed_count} failed' if failed_count > 0 else '')
+                           + (f', {skipped_count} duplicates skipped' if skipped_count > 0 else ''),
                 'sent': sent_count,
                 'failed': failed_count,
+                'skipped': skipped_count,
                 'failed_details': failed_recipients
             }
         except Exception as e:
+            # Recipients already sent, failed or skipped keep their count; the rest were never tried
             return {
                 'success': False,
                 'message': f'Critical error: {str(e)}',
-                'sent': 0,
-                'failed': len(recipients)
+                'sent': sent_count,
+                'failed': failed_count + (len(recipients) - attempted),
+                'skipped': skipped_count
             }
-    @staticmethod
-    def _replace_placeholders(text: str, data: Dict[str, Any]) -> str:
-        result = text
-        for key, value in data.items():
-            placeholders = [
-                f'{{{key.upper()}}}',
-                f'<{key.upper()}>',
-                f'[{key.upper()}]',
-                f'{{{{{key.upper()}}}}}',
-                f'<<{key.upper()}>>',
-                f'[[{key.upper()}]]'
-            ]
-            str_value = str(value) if value is not None else ''
-            for placeholder in placeholders:
-                result = result.replace(placeholder, str_value)
-        return result
+def _import_source(file_path: str, sheet_name: str = None, use_cache: bool = True) -> Dict[str, Any]:
+    """Process pool entry point for FileImporter.import_files"""
+    return FileImporter.import_file(file_path, sheet_name=sheet_name, use_cache=use_cache)
+class ImportCancelled(Exception):
+    """Raised from a progress callback to abort an import between chunks"""
+class ImportWorker(QThread):
+    """Runs FileImporter.import_file off the GUI thread.
+    The dataset is built privately by the worker and only handed to the UI through
+    import_finished once complete; preview_ready carries a separate copy of the first rows."""
+    progress = pyqtSignal(int, int, float)
+    preview_ready = pyqtSignal(object)
+    import_finished = pyqtSignal(dict)
+    def __init__(self, file_path: str, sheet_name: str = None, tables: List[int] = None,
+                 sources: List[Tuple[str, str]] = None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.tables = tables
+        self.sources = sources
+        self._cancel_event = threading.Event()
+        self._dataset = None
+        self._preview_sent = False
+    def cancel(self):
+        self._cancel_event.set()
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+    def _on_preview(self, headers, rows):
+        if self._cancel_event.is_set():
+            raise ImportCancelled()
+        if not self._preview_sent and headers:
+            self.preview_ready.emit(Dataset.from_rows(headers, rows))
+            self._preview_sent = True
+    def _on_progress(self, headers, rows_loaded, percent, rows_per_sec):
+        if self._cancel_event.is_set():
+            raise ImportCancelled()
+        if not self._preview_sent and headers:
+            self._on_preview(headers, [self._dataset.row(i) for i in range(min(len(self._dataset), IMPORT_PREVIEW_ROWS))])
+        self.progress.emit(rows_loaded, percent, rows_per_sec)
+    def run(self):
+        self._dataset = Dataset()
+        try:
+            if self.sources:
+                result = FileImporter.import_files(self.sources, self._on_progress, cancelled=self._cancel_event.is_set)
+            else:
+                result = FileImporter.import_file(self.file_path, self._dataset, self._on_progress, self.sheet_name,
+                                                  tables=self.tables, preview_callback=self._on_preview)
+        except ImportCancelled:
+            result = None  # reported as cancelled below
+        except Exception as e:
+            logger.error(f"Critical error during import: {e}")
+            result = {
+                'headers': [], 'data': [], 'success': False,
+                'message': f'An unexpected error occurred: {str(e)}'
+            }
+        if self._cancel_event.is_set():
+            result = {
+                'headers': [], 'data': [], 'success': False, 'cancelled': True,
+                'message': 'Import cancelled.'
+            }
+        elif result['success']:
+            # Build the search and duplicate indexes here rather than on first use in the UI
+            result['data'].search_index()
+            email_column = find_email_column(result['headers'])
+            if email_column >= 0:
+                result['data'].duplicate_index(email_column)
+                result['data'].address_checks(email_column)
+            if logger.isEnabledFor(logging.DEBUG):
+                for stats in result['data'].memory_stats():
+                    logger.debug(f"Column {stats['column']!r}: {stats['kind']}, {stats['encoding']}, "
+                                 f"{stats['distinct']:,} distinct values, {stats['bytes'] / 1024:,.0f} KB")
+        self._dataset = None
+        self.import_finished.emit(result)
+class FilterWorker(QThread):
+    """Runs Dataset.search for the search box off the GUI thread.
+    Each worker answers one query. cancel() makes the search stop at its next check, and
+    filter_finished carries the generation the query was started for, so the window can
+    tell a current result from one that a newer query has overtaken."""
+    filter_finished = pyqtSignal(int, object)
+    def __init__(self, dataset: Dataset, search_text: str, generation: int, parent=None):
+        super().__init__(parent)
+        self.dataset = dataset
+        self.search_text = search_text
+        self.generation = generation
+        self._cancel_event = threading.Event()
+    def cancel(self):
+        self._cancel_event.set()
+    def run(self):
+        try:
+            row_ids = self.dataset.search(self.search_text, cancelled=self._cancel_event.is_set)
+        except SearchCancelled:
+            row_ids = None
+        except Exception as e:
+            logger.error(f"Error filtering data: {e}")
+            row_ids = None
+        self.filter_finished.emit(self.generation, row_ids)
+class WordTableListWorker(QThread):
+    """Runs FileImporter.list_word_tables off the GUI thread - counting the rows of every
+    table means parsing the whole document. Tables without data rows are left out."""
+    tables_ready = pyqtSignal(str, list)
+    def __init__(self, file_path: str, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+    def run(self):
+        try:
+            tables = [table for table in FileImporter.list_word_tables(self.file_path) if table['rows']]
+        except Exception as e:
+            logger.warning(f"Could not list tables of {self.file_path}: {e}")
+            tables = []
+        self.tables_ready.emit(self.file_path, tables)
+class AccountDiscoveryWorker(QThread):
+    """Runs EmailSender.discover_email_accounts off the GUI thread.
+    COM is initialised for the thread; only plain account dicts cross back to the UI."""
+    accounts_ready = pyqtSignal(dict)
+    def __init__(self, outlook_factory=None, parent=None):
+        super().__init__(parent)
+        self.outlook_factory = outlook_factory
+    def run(self):
+        try:
+            import pythoncom
+        except ImportError:
+            pythoncom = None
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            result = EmailSender.discover_email_accounts(self.outlook_factory)
+        except Exception as e:
+            logger.error(f"Critical error during account discovery: {e}")
+            result = {'accounts': [], 'success': False, 'title': "Error", 'message': f"Error loading email accounts:\n\n{str(e)}"}
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+        self.accounts_ready.emit(result)
 class UniversalSender(QMainWindow):
-    def __init__(self, loading_screen=None):
+    def __init__(self, loading_screen=None, outlook_factory=None):
         super().__init__()
         self.loading_screen = loading_screen
         self.setWindowTitle("Universal Email Sender")
         self.setGeometry(100, 100, 1200, 800)  
         self.setMinimumSize(1200, 800)
         self.setMaximumSize(1200, 800)  
-        self.imported_data = []
+        self.imported_data = Dataset()
         self.processed_data = []
-        self.filtered_data = []
-        self.selected_rows = set()  
+        self.filtered_data = self.imported_data.view()
+        self.selected_rows = RowSelection(self)
+        self.selected_rows.changed.connect(self.on_selection_changed)
         self.attachments = []  
         self.email_accounts_list = []  
         self.headers = []
         self.placeholders = []
         self.column_mapping = {}
+        self.mapping_memory = MappingMemory()
+        self.column_matcher = None
+        self.confirmed_mappings = {}
+        self.sort_keys = []
         self.email_accounts = []
         self.template_formatting = {}  
+        self.column_formatters = {}
+        self.format_cache = FormattedValueCache()
         self.bullet_styles = {
             "Dash": "-",
             "Bullet": "•",
@@ -575,8 +997,21 @@ class UniversalSender(QMainWindow):
             "Star": "★"
         }
         self.tab_widgets = {}
+        self.import_worker = None
+        self.import_previous_state = None
+        self.filter_worker = None
+        self.filter_generation = 0
+        self.filter_pending = False
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.filter_table_data)
         self.tabs_created = set()
         self.email_accounts_loaded = False
+        self.account_worker = None
+        self.table_list_worker = None
+        self.import_paths = []
+        self.outlook_factory = outlook_factory
         self.replacement_pairs = []  
         self.setup_ui()
         self.apply_theme()
@@ -612,6 +1047,8 @@ class UniversalSender(QMainWindow):
         path_layout = QHBoxLayout()
         self.file_path_input = QLineEdit()
         self.file_path_input.setPlaceholderText("Select file to import...")
+        # Typing a path replaces the files picked with Browse
+        self.file_path_input.textEdited.connect(lambda _: self.import_paths.clear())
         browse_btn = QPushButton("Browse")
         browse_btn.setStyleSheet(get_button_style('primary'))
         browse_btn.clicked.connect(self.browse_file)
@@ -626,11 +1063,20 @@ class UniversalSender(QMainWindow):
         self.import_btn.clicked.connect(self.import_file)
         self.import_btn.setEnabled(False)
         import_layout.addWidget(self.import_btn)
+        self.cancel_import_btn = QPushButton("Cancel")
+        self.cancel_import_btn.setStyleSheet(get_button_style('danger'))
+        self.cancel_import_btn.clicked.connect(self.cancel_import)
+        self.cancel_import_btn.setVisible(False)
+        import_layout.addWidget(self.cancel_import_btn)
         import_layout.addStretch()
         file_layout.addLayout(import_layout)
+        self.import_progress_bar = QProgressBar()
+        self.import_progress_bar.setVisible(False)
+        file_layout.addWidget(self.import_progress_bar)
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         preview_group = QGroupBox("Imported Data Preview")
+        self.import_preview_group = preview_group
         preview_layout = QVBoxLayout()
         preview_layout.setContentsMargins(12, 15, 12, 12)
         preview_layout.setSpacing(10)
@@ -643,14 +1089,19 @@ class UniversalSender(QMainWindow):
         deselect_all_btn.setStyleSheet(get_button_style('default'))
         deselect_all_btn.setMaximumWidth(100)
         deselect_all_btn.clicked.connect(self.deselect_all_rows)
+        invert_selection_btn = QPushButton("Invert")
+        invert_selection_btn.setStyleSheet(get_button_style('default'))
+        invert_selection_btn.setMaximumWidth(100)
+        invert_selection_btn.clicked.connect(self.invert_selection)
         search_filter_layout.addWidget(select_all_btn)
         search_filter_layout.addWidget(deselect_all_btn)
+        search_filter_layout.addWidget(invert_selection_btn)
         search_filter_layout.addWidget(QLabel("|"))  
         search_label = QLabel("Search:")
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Type to search in all columns...")
         self.search_input.setMaximumWidth(250)
-        self.search_input.textChanged.connect(self.filter_table_data)
+        self.search_input.textChanged.connect(self.filter_timer.start)
         filter_label = QLabel("Sort Column:")
         self.filter_column_combo = QComboBox()
         self.filter_column_combo.setMaximumWidth(150)
@@ -673,13 +1124,46 @@ class UniversalSender(QMainWindow):
         search_filter_layout.addWidget(clear_btn)
         search_filter_layout.addStretch()
         preview_layout.addLayout(search_filter_layout)
-        self.data_table = QTableWidget()
+        recipient_tools_layout = QHBoxLayout()
+        self.duplicates_btn = QPushButton("Show Duplicates")
+        self.duplicates_btn.setStyleSheet(get_button_style('default'))
+        self.duplicates_btn.setCheckable(True)
+        self.duplicates_btn.setEnabled(False)
+        self.duplicates_btn.toggled.connect(self.filter_table_data)
+        self.dedupe_btn = QPushButton("Uncheck Duplicates...")
+        self.dedupe_btn.setStyleSheet(get_button_style('warning'))
+        self.dedupe_btn.setEnabled(False)
+        self.dedupe_btn.clicked.connect(self.uncheck_duplicates)
+        self.invalid_btn = QPushButton("Show Invalid Addresses")
+        self.invalid_btn.setStyleSheet(get_button_style('default'))
+        self.invalid_btn.setCheckable(True)
+        self.invalid_btn.setEnabled(False)
+        self.invalid_btn.toggled.connect(self.filter_table_data)
+        self.recipient_info_label = QLabel("")
+        self.recipient_info_label.setStyleSheet(f"color: {var_theme.colors['text_muted']}; font-size: 9pt;")
+        recipient_tools_layout.addWidget(self.duplicates_btn)
+        recipient_tools_layout.addWidget(self.dedupe_btn)
+        recipient_tools_layout.addWidget(self.invalid_btn)
+        recipient_tools_layout.addWidget(self.recipient_info_label)
+        recipient_tools_layout.addStretch()
+        preview_layout.addLayout(recipient_tools_layout)
+        self.data_table = QTableView()
         self.data_table.setMinimumHeight(200)
         self.data_table.setMaximumHeight(300)
         self.data_table.setStyleSheet(get_table_style())
         self.data_table.setAlternatingRowColors(True)
-        self.data_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.data_table.setSelectionMode(QTableWidget.MultiSelection)
+        self.data_table.setSelectionBehavior(QTableView.SelectRows)
+        self.data_table.setSelectionMode(QTableView.MultiSelection)
+        self.data_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.data_table_model = DataTableModel(self)
+        self.data_table.setModel(self.data_table_model)
+        sort_header = self.data_table.horizontalHeader()
+        # Header clicks sort (Shift+click adds a secondary column) instead of selecting a column
+        sort_header.sectionPressed.disconnect()
+        sort_header.setSortIndicatorShown(True)
+        sort_header.setSortIndicator(-1, Qt.AscendingOrder)
+        sort_header.sectionClicked.connect(self.on_header_clicked)
+        self.data_table.selectionModel().selectionChanged.connect(self.update_selection_info)
         preview_layout.addWidget(self.data_table)
         self.selection_info_label = QLabel("No data loaded")
         self.selection_info_label.setStyleSheet(f"color: {var_theme.colors['text_muted']}; font-size: 9pt; padding: 5px;")
@@ -1281,13 +1765,13 @@ class UniversalSender(QMainWindow):
                 return
             preview_row_index = 0
             if self.selected_rows:
-                preview_row_index = min(self.selected_rows)
+                preview_row_index = self.selected_rows.first()
                 preview_source = f"Selected Row {preview_row_index + 1}"
             else:
                 preview_source = "First Row (no selection)"
             if preview_row_index >= len(self.imported_data):
                 preview_row_index = 0
-            sample_data = self.imported_data[preview_row_index][col_index] if col_index < len(self.imported_data[preview_row_index]) else ""
+            sample_data = self.imported_data.value(preview_row_index, col_index)
             formatted = self.format_column_data_new(str(sample_data), column)
             self.format_preview.setText(f"Preview from: {preview_source}\n\nOriginal:\n{sample_data}\n\n{'='*40}\n\nFormatted:\n{formatted}")
         except Exception as e:
@@ -1300,43 +1784,54 @@ class UniversalSender(QMainWindow):
         formatted = str(data)
         if column not in self.template_formatting:
             return formatted
+        return self.format_cache.format(column, formatted, self.column_formatter(column))
+    def column_formatter(self, column: str) -> ColumnFormatter:
+        """Compiled formatting rules of column; compiled again only once its rules were saved again"""
         settings = self.template_formatting[column]
-        replacements = settings.get('replacements', [])
-        for replacement_tuple in replacements:
-            if len(replacement_tuple) == 3:
-                find_text, replace_text, special_type = replacement_tuple
-            else:
-                find_text, replace_text = replacement_tuple
-                special_type = None
-            if find_text:
-                actual_replacement = special_type if special_type is not None else replace_text
-                formatted = formatted.replace(find_text, actual_replacement)
-        bullet_enabled = settings.get('bullet_enabled', False)
-        if bullet_enabled:
-            bullet = settings.get('bullet', '-')
-            lines = formatted.split('\n')
-            formatted_lines = []
-            for line in lines:
-                line = line.strip()
-                if line:
-                    formatted_lines.append(f"\t{bullet} {line}")
-            formatted = '\n'.join(formatted_lines)
-        return formatted
+        formatter = self.column_formatters.get(column)
+        if formatter is None or formatter.settings is not settings:
+            formatter = self.column_formatters[column] = ColumnFormatter(settings)
+            self.format_cache.invalidate(column)
+        return formatter
     def format_column_data(self, data, column):
         """Legacy compatibility - redirects to new formatting function"""
         return self.format_column_data_new(data, column)
     def process_template_placeholders(self, template, row_data):
         if not self.headers or not row_data:
             return template
-        processed_template = template
-        for i, header in enumerate(self.headers):
-            placeholder = f"{{{header.upper()}}}"
-            if placeholder in processed_template and i < len(row_data):
-                data = str(row_data[i]) if row_data[i] is not None else ""
-                if header in self.template_formatting:
-                    data = self.format_column_data(data, header)
-                processed_template = processed_template.replace(placeholder, data)
-        return processed_template
+        compiled = CompiledTemplate(template, self.headers, FIELD_KINDS[:1], exact_case=False)
+        return compiled.render(self.render_values(compiled.columns, row_data))
+    def render_values(self, columns: List[int], row_data) -> List[str]:
+        """Formatted cell text of row_data for the given columns, indexed by column; a column
+        the row is too short for renders as its own placeholder, as if it was never replaced"""
+        values = [''] * len(self.headers)
+        for column_index in columns:
+            header = self.headers[column_index]
+            if column_index >= len(row_data):
+                values[column_index] = f"{{{header.upper()}}}"
+                continue
+            data = cell_text(row_data[column_index])
+            if header in self.template_formatting:
+                data = self.format_column_data(data, header)
+            values[column_index] = data
+        return values
+    def render_recipients(self, row_ids: np.ndarray, subject_template: CompiledTemplate,
+                          body_template: CompiledTemplate, columns: List[int]) -> List[Dict[str, Any]]:
+        """Rendered messages for the rows row_ids, as the recipient dicts EmailSender.send_emails takes.
+        Each used column is converted and formatted once per distinct value among the rows, then all
+        subjects and bodies are assembled column by column; a recipient only carries its address
+        columns and the rendered text, not a copy of the whole row."""
+        formats = {column_index: (lambda text, header=self.headers[column_index]: self.format_column_data(text, header))
+                   for column_index in columns if self.headers[column_index] in self.template_formatting}
+        texts = column_texts(self.imported_data, row_ids, columns, formats)
+        subjects = subject_template.render_all(texts, len(row_ids))
+        bodies = body_template.render_all(texts, len(row_ids))
+        address_columns = [(header, self.imported_data.columns[self.headers.index(header)])
+                           for header in RECIPIENT_EMAIL_HEADERS if header in self.headers]
+        addresses = [[column.values[code] for code in column.codes[row_ids].tolist()] for _, column in address_columns]
+        address_headers = [header for header, _ in address_columns]
+        return [dict(zip(address_headers, row_addresses), _processed_subject=subject, _processed_template=body)
+                for subject, body, *row_addresses in zip(subjects, bodies, *addresses)]
     def create_send_tab(self) -> QWidget:
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -1353,7 +1848,7 @@ class UniversalSender(QMainWindow):
         self.account_combo.currentIndexChanged.connect(self.update_send_summary)
         refresh_btn = QPushButton("Refresh")
         refresh_btn.setStyleSheet(get_button_style('default'))
-        refresh_btn.clicked.connect(self.load_email_accounts)
+        refresh_btn.clicked.connect(self.refresh_email_accounts)
         account_layout.addWidget(QLabel("Account:"))
         account_layout.addWidget(self.account_combo)
         account_layout.addWidget(refresh_btn)
@@ -1506,12 +2001,8 @@ class UniversalSender(QMainWindow):
             self.tabs.addTab(widget, label)
             self.tabs_created.add(i)
             self.tab_widgets[i] = widget
-        if self.loading_screen:
-            self.loading_screen.update_progress(85, "Loading email accounts...")
-            QApplication.processEvents()
         if not self.email_accounts_loaded:
-            self.load_email_accounts()
-            self.email_accounts_loaded = True
+            self.refresh_email_accounts()
         self.tabs.setCurrentIndex(0)
     def on_tab_clicked(self, index):
         """Handle tab click navigation"""
@@ -1519,9 +2010,9 @@ class UniversalSender(QMainWindow):
             self.tabs.setCurrentIndex(index)
     def on_tab_changed(self, index):
         """Handle tab switching - reload data when needed"""
-        # Reload email accounts when switching to Send tab (index 4)
-        if index == 4 and hasattr(self, 'account_combo'):
-            self.load_email_accounts()
+        # Accounts are discovered once in the background; Refresh on the Send tab (index 4) reloads them
+        if index == 4 and hasattr(self, 'account_combo') and not self.email_accounts_loaded:
+            self.refresh_email_accounts()
         
         # Update mapping table when switching to Mapping tab (index 2)
         if index == 2 and hasattr(self, 'mapping_table'):
@@ -1532,77 +2023,195 @@ class UniversalSender(QMainWindow):
             self.update_format_preview()  
     def browse_file(self):
         file_filter = "All Files (*.*);;CSV Files (*.csv);;Excel Files (*.xlsx)"
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select File to Import", "", file_filter
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select File(s) to Import", "", file_filter
         )
-        if file_path:
-            self.file_path_input.setText(file_path)
+        if file_paths:
+            self.import_paths = list(file_paths)
+            self.file_path_input.setText('; '.join(file_paths))
             self.import_btn.setEnabled(True)
     def import_file(self):
         file_path = self.file_path_input.text().strip()
-        if not file_path:
+        # The picked paths are kept as a list: ';' is a legal character in file names
+        file_paths = list(self.import_paths) or ([file_path] if file_path else [])
+        if not file_paths:
             QMessageBox.warning(self, "Warning", "Please select a file to import.")
             return
-        try:
-            result = FileImporter.import_file(file_path)
-            if result['success']:
-                self.imported_data = result['data']
-                self.headers = result['headers']
-                if hasattr(self, 'format_column_combo'):
-                    self.format_column_combo.clear()
-                    self.format_column_combo.addItems(self.headers)
-                self.populate_data_table()
-                self.next_btn_1.setEnabled(True)
-                self.statusBar().showMessage(f"Imported {len(self.imported_data)} rows")
-                # Instantly update mapping table if placeholders exist
-                if self.placeholders and hasattr(self, 'mapping_table'):
-                    self.update_mapping_table()
-                QMessageBox.information(self, "Success", result['message'])
+        file_path = file_paths[0]
+        sheet_name = None
+        tables = None
+        sources = None
+        file_type = FileImporter.detect_file_type(file_path)
+        if len(file_paths) > 1:
+            # Missing files are reported per source by FileImporter.import_files
+            sources = [(path, None) for path in file_paths]
+        elif file_type == 'excel' and os.path.exists(file_path):
+            try:
+                sheets = FileImporter.list_excel_sheets(file_path)
+            except Exception as e:
+                logger.warning(f"Could not list sheets of {file_path}: {e}")
+                sheets = []
+            if len(sheets) > 1:
+                all_sheets = "All sheets (combined)"
+                sheet_name, ok = QInputDialog.getItem(
+                    self, "Select Sheet", "This workbook has several sheets.\nChoose the sheet to import:",
+                    sheets + [all_sheets], 0, False
+                )
+                if not ok:
+                    return
+                if sheet_name == all_sheets:
+                    sheet_name = None
+                    sources = [(file_path, sheet) for sheet in sheets]
+        elif file_type == 'word' and os.path.exists(file_path):
+            if self.import_worker is not None or self.table_list_worker is not None:
+                return
+            self.import_btn.setEnabled(False)
+            self.statusBar().showMessage(f"Reading tables of {os.path.basename(file_path)}...")
+            self.table_list_worker = WordTableListWorker(file_path, self)
+            self.table_list_worker.tables_ready.connect(self.on_word_tables_listed)
+            self.table_list_worker.start()
+            return
+        self.start_import(file_path, sheet_name, tables, sources)
+    def on_word_tables_listed(self, file_path, word_tables):
+        """Offer the tables of a Word document once the worker has counted them, then import"""
+        self.table_list_worker.wait()
+        self.table_list_worker = None
+        self.import_btn.setEnabled(True)
+        self.statusBar().clearMessage()
+        tables = None
+        if len(word_tables) > 1:
+            tables = self.choose_word_tables(word_tables)
+            if tables is None:
+                return
+        self.start_import(file_path, tables=tables)
+    def start_import(self, file_path: str, sheet_name: str = None, tables: List[int] = None,
+                     sources: List[Tuple[str, str]] = None):
+        """Start an ImportWorker, keeping the current data to restore if it fails or is cancelled"""
+        if self.import_worker is not None:
+            return
+        self.cancel_filter()
+        self.import_previous_state = (self.imported_data, self.headers, self.filtered_data, self.selected_rows.row_ids())
+        self.imported_data = Dataset()
+        self.headers = []
+        self.filtered_data = self.imported_data.view()
+        self.selected_rows.clear()
+        self.update_recipient_tools()
+        self.import_btn.setEnabled(False)
+        self.import_preview_group.setEnabled(False)
+        self.cancel_import_btn.setVisible(True)
+        self.cancel_import_btn.setEnabled(True)
+        self.import_progress_bar.setRange(0, 0)
+        self.import_progress_bar.setVisible(True)
+        if sources:
+            self.statusBar().showMessage(f"Importing {len(sources)} sources...")
+        else:
+            self.statusBar().showMessage(f"Importing {os.path.basename(file_path)}...")
+        self.import_worker = ImportWorker(file_path, sheet_name, tables, sources, self)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.preview_ready.connect(self.on_import_preview)
+        self.import_worker.import_finished.connect(self.on_import_finished)
+        self.import_worker.start()
+    def choose_word_tables(self, word_tables):
+        """Ask which Word table to import, offering to combine tables that share the same headers"""
+        choices = []
+        groups = {}
+        for table in word_tables:
+            columns = ', '.join(table['headers'][:4]) + (', ...' if len(table['headers']) > 4 else '')
+            choices.append((f"Table {table['index'] + 1}: {table['rows']:,} rows ({columns})", [table['index']]))
+            groups.setdefault(tuple(table['headers']), []).append(table)
+        for group in groups.values():
+            if len(group) > 1:
+                numbers = ', '.join(str(table['index'] + 1) for table in group)
+                rows = sum(table['rows'] for table in group)
+                choices.append((f"Tables {numbers} combined: {rows:,} rows", [table['index'] for table in group]))
+        label, ok = QInputDialog.getItem(
+            self, "Select Table", "This document has several tables.\nChoose the table to import:",
+            [label for label, _ in choices], 0, False
+        )
+        if not ok:
+            return None
+        return dict(choices)[label]
+    def cancel_import(self):
+        if self.import_worker is not None:
+            self.import_worker.cancel()
+            self.cancel_import_btn.setEnabled(False)
+            self.statusBar().showMessage("Cancelling import...")
+    def on_import_progress(self, rows_loaded, percent, rows_per_sec):
+        """Report streaming import progress from the worker"""
+        if self.import_worker is None or self.import_worker.is_cancelled():
+            return
+        if percent > 0:
+            self.import_progress_bar.setRange(0, 100)
+            self.import_progress_bar.setValue(percent)
+        self.statusBar().showMessage(
+            f"Importing... {rows_loaded:,} rows ({percent}%) - {rows_per_sec:,.0f} rows/sec"
+        )
+    def on_import_preview(self, preview):
+        """Show the first rows before the file finishes loading"""
+        self.imported_data = preview
+        self.headers = preview.headers
+        self.filtered_data = preview.view()
+        self.update_table_display()
+        self.selection_info_label.setText(f"Loading... showing first {len(preview)} rows")
+    def on_import_finished(self, result):
+        """Swap in the imported dataset in one step once the worker is done"""
+        self.import_worker.wait()
+        self.import_worker = None
+        previous_state, self.import_previous_state = self.import_previous_state, None
+        self.import_btn.setEnabled(True)
+        self.import_preview_group.setEnabled(True)
+        self.cancel_import_btn.setVisible(False)
+        self.import_progress_bar.setVisible(False)
+        if result['success']:
+            self.imported_data = result['data']
+            self.headers = result['headers']
+            if hasattr(self, 'format_column_combo'):
+                self.format_column_combo.clear()
+                self.format_column_combo.addItems(self.headers)
+            self.populate_data_table()
+            self.next_btn_1.setEnabled(True)
+            self.statusBar().showMessage(f"Imported {len(self.imported_data)} rows")
+            # Instantly update mapping table if placeholders exist
+            if self.placeholders and hasattr(self, 'mapping_table'):
+                self.update_mapping_table()
+            QMessageBox.information(self, "Success", result['message'])
+        else:
+            self.restore_import_state(previous_state)
+            if result.get('cancelled'):
+                self.statusBar().showMessage("Import cancelled")
             else:
+                self.statusBar().showMessage("Import failed")
                 QMessageBox.critical(self, "Import Error", result['message'])
-        except Exception as e:
-            logger.error(f"Critical error during import: {e}")
-            QMessageBox.critical(self, "Critical Error", f"An unexpected error occurred: {str(e)}")
+    def restore_import_state(self, state):
+        """Put back the previously imported data after a failed or cancelled import"""
+        self.cancel_filter()
+        self.imported_data, self.headers, self.filtered_data, selected_rows = state
+        with self.selected_rows.batch():
+            self.selected_rows.clear()
+            self.selected_rows.select(selected_rows)
+        self.update_recipient_tools()
+        if self.headers:
+            self.update_table_display()
+        else:
+            self.data_table_model.clear()
+        self.update_selection_info()
     def populate_data_table(self):
         if not self.imported_data or not self.headers:
             return
-        self.filtered_data = self.imported_data.copy()
+        self.cancel_filter()
+        self.filtered_data = self.imported_data.view()
+        self.sort_keys = []
+        self.update_recipient_tools()
         self.filter_column_combo.clear()
         self.filter_column_combo.addItem("-- Select Column --")
         self.filter_column_combo.addItems(self.headers)
         self.update_table_display()
-        self.data_table.selectionModel().selectionChanged.connect(self.update_selection_info)
         self.update_selection_info()
     def update_table_display(self):
-        try:
-            self.data_table.itemChanged.disconnect(self.on_checkbox_changed)
-        except:
-            pass
-        display_data = self.filtered_data  
-        self.data_table.setRowCount(len(display_data))
-        self.data_table.setColumnCount(len(self.headers) + 1)  
-        table_headers = ["✓"] + self.headers
-        self.data_table.setHorizontalHeaderLabels(table_headers)
-        self.data_table.setColumnWidth(0, 40)
-        for row, data in enumerate(display_data):
-            checkbox_item = QTableWidgetItem()
-            checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-            original_row_index = -1
-            for idx, imported_row in enumerate(self.imported_data):
-                if len(imported_row) == len(data) and all(str(a) == str(b) for a, b in zip(imported_row, data)):
-                    original_row_index = idx
-                    break
-            if original_row_index in self.selected_rows:
-                checkbox_item.setCheckState(Qt.Checked)
-            else:
-                checkbox_item.setCheckState(Qt.Unchecked)
-            self.data_table.setItem(row, 0, checkbox_item)
-            for col, value in enumerate(data):
-                item = QTableWidgetItem(str(value) if value is not None else '')
-                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)  
-                self.data_table.setItem(row, col + 1, item)  
-        self.data_table.itemChanged.connect(self.on_checkbox_changed)
+        """Point the table model at the current filtered view; cells are read on demand"""
+        self.data_table_model.set_view(self.filtered_data, self.headers, self.selected_rows)
         self.data_table.resizeColumnsToContents()
+        self.data_table.setColumnWidth(0, 40)
     def update_selection_info(self):
         checked_rows = len(self.selected_rows)
         total_filtered = len(self.filtered_data)
@@ -1617,96 +2226,201 @@ class UniversalSender(QMainWindow):
         # Instantly update send summary when selection changes
         self.update_send_summary()
     def filter_table_data(self):
+        """Filter by the search box once typing pauses; the search itself runs on a FilterWorker"""
+        self.filter_timer.stop()
         if not self.imported_data:
             return
+        self.filter_generation += 1
         search_text = self.search_input.text().strip().lower()
         if not search_text:
-            self.filtered_data = self.imported_data.copy()
-        else:
-            self.filtered_data = []
-            for row in self.imported_data:
-                row_text = ' '.join(str(cell).lower() for cell in row if cell is not None)
-                if search_text in row_text:
-                    self.filtered_data.append(row)
-        self.sort_table_data()
+            self.cancel_filter()
+            self.filtered_data = self.imported_data.view()
+            self.show_filtered_data()
+            return
+        if self.filter_worker is not None:
+            # Only one search runs at a time: stop the stale one, on_filter_finished starts this one
+            self.filter_worker.cancel()
+            self.filter_pending = True
+            return
+        self.start_filter_worker(search_text)
+    def start_filter_worker(self, search_text: str):
+        # Make sure the index exists before the worker reads it, rather than building it on two threads
+        self.imported_data.search_index()
+        self.filter_pending = False
+        self.filter_worker = FilterWorker(self.imported_data, search_text, self.filter_generation, self)
+        self.filter_worker.filter_finished.connect(self.on_filter_finished)
+        self.filter_worker.start()
+        self.statusBar().showMessage(f"Searching for \"{search_text}\"...")
+    def on_filter_finished(self, generation, row_ids):
+        """Apply a search result, unless a newer query was typed while it ran"""
+        self.filter_worker.wait()
+        self.filter_worker = None
+        if generation != self.filter_generation:
+            search_text = self.search_input.text().strip().lower()
+            if self.filter_pending and search_text and self.imported_data:
+                self.start_filter_worker(search_text)
+            return
+        self.statusBar().clearMessage()
+        if row_ids is None:
+            self.statusBar().showMessage("Search failed")
+            return
+        self.filtered_data = self.imported_data.view(row_ids)
+        self.show_filtered_data()
+    def cancel_filter(self):
+        """Drop any pending or running search, e.g. before the data it searches is replaced"""
+        self.filter_timer.stop()
+        self.filter_generation += 1
+        self.filter_pending = False
+        if self.filter_worker is not None:
+            self.filter_worker.cancel()
+    def show_filtered_data(self):
+        address_checks = self.address_checks()
+        if address_checks is not None and self.invalid_btn.isChecked():
+            self.filtered_data = self.imported_data.view(address_checks.invalid_rows(self.filtered_data.row_ids))
+        duplicate_index = self.duplicate_index()
+        if duplicate_index is not None and self.duplicates_btn.isChecked():
+            self.filtered_data = self.imported_data.view(duplicate_index.duplicate_rows(self.filtered_data.row_ids))
+        self.apply_sort()
         self.update_table_display()
         self.update_selection_info()
     def sort_table_data(self):
-        if not self.filtered_data or not hasattr(self, 'filter_column_combo'):
+        """Sort by the column and order picked in the combos, keeping any Shift+click secondary columns"""
+        if not hasattr(self, 'filter_column_combo') or not self.headers:
             return
         column_name = self.filter_column_combo.currentText()
-        if column_name == "-- Select Column --" or column_name not in self.headers:
+        if column_name not in self.headers:
+            if column_name != "-- Select Column --":
+                return
+            self.sort_keys = []
+        else:
+            column_index = self.headers.index(column_name)
+            reverse = self.sort_order_combo.currentText() == "Z-A"
+            self.sort_keys = [(column_index, reverse)] + [key for key in self.sort_keys[1:] if key[0] != column_index]
+        self.show_filtered_data()
+    def on_header_clicked(self, section):
+        """Click sorts by a column or flips its order; Shift+click adds or flips a secondary column"""
+        if section == 0 or not self.headers:
             return
-        column_index = self.headers.index(column_name)
-        sort_order = self.sort_order_combo.currentText()
-        reverse = (sort_order == "Z-A")
+        column_index = section - 1
+        if QApplication.keyboardModifiers() & Qt.ShiftModifier and self.sort_keys:
+            if column_index in dict(self.sort_keys):
+                self.sort_keys = [(index, not reverse if index == column_index else reverse) for index, reverse in self.sort_keys]
+            else:
+                self.sort_keys = self.sort_keys + [(column_index, False)]
+        else:
+            primary = self.sort_keys[0] if self.sort_keys else None
+            self.sort_keys = [(column_index, not primary[1] if primary and primary[0] == column_index else False)]
+        for combo, text in ((self.filter_column_combo, self.headers[self.sort_keys[0][0]]),
+                            (self.sort_order_combo, "Z-A" if self.sort_keys[0][1] else "A-Z")):
+            combo.blockSignals(True)
+            combo.setCurrentText(text)
+            combo.blockSignals(False)
+        self.show_filtered_data()
+    def apply_sort(self):
+        """Reorder filtered_data by sort_keys using the dataset's cached sort orders"""
+        header = self.data_table.horizontalHeader()
         try:
-            self.filtered_data.sort(
-                key=lambda row: str(row[column_index] if column_index < len(row) and row[column_index] is not None else ''),
-                reverse=reverse
-            )
-            self.update_table_display()
-            self.update_selection_info()
+            duplicate_index = self.duplicate_index()
+            if self.sort_keys:
+                self.filtered_data = self.filtered_data.sorted_by_columns(self.sort_keys)
+            elif duplicate_index is not None and self.duplicates_btn.isChecked():
+                # Unsorted, the duplicates view keeps the rows of each address together
+                self.filtered_data = self.imported_data.view(duplicate_index.duplicate_rows(
+                    np.sort(self.filtered_data.row_ids)))
+            else:
+                self.filtered_data = self.filtered_data.in_import_order()
         except Exception as e:
             logger.warning(f"Error sorting data: {e}")
+            return
+        if self.sort_keys:
+            column_index, reverse = self.sort_keys[0]
+            header.setSortIndicator(column_index + 1, Qt.DescendingOrder if reverse else Qt.AscendingOrder)
+            self.statusBar().showMessage("Sorted by " + ", then ".join(
+                f"{self.headers[index]} ({'Z-A' if reverse else 'A-Z'})" for index, reverse in self.sort_keys))
+        else:
+            header.setSortIndicator(-1, Qt.AscendingOrder)
     def clear_filters(self):
+        self.cancel_filter()
+        self.sort_keys = []
+        filter_widgets = (self.search_input, self.filter_column_combo, self.sort_order_combo, self.duplicates_btn,
+                          self.invalid_btn)
+        for widget in filter_widgets:
+            widget.blockSignals(True)
         self.search_input.clear()
         self.filter_column_combo.setCurrentIndex(0)
         self.sort_order_combo.setCurrentIndex(0)
-        self.filtered_data = self.imported_data.copy()
-        self.update_table_display()
-        self.update_selection_info()
-    def on_checkbox_changed(self, item):
-        if item.column() == 0:  
-            row = item.row()
-            if row < len(self.filtered_data):
-                data_row = self.filtered_data[row]
-                original_index = -1
-                for idx, imported_row in enumerate(self.imported_data):
-                    if len(imported_row) == len(data_row) and all(str(a) == str(b) for a, b in zip(imported_row, data_row)):
-                        original_index = idx
-                        break
-                if original_index >= 0:
-                    if item.checkState() == Qt.Checked:
-                        self.selected_rows.add(original_index)
-                    else:
-                        self.selected_rows.discard(original_index)
-            self.update_selection_info()
-            if hasattr(self, 'format_preview'):
-                self.update_format_preview()
-    def select_all_rows(self):
-        try:
-            self.data_table.itemChanged.disconnect(self.on_checkbox_changed)
-        except:
-            pass
-        for row in range(self.data_table.rowCount()):
-            checkbox_item = self.data_table.item(row, 0)
-            if checkbox_item:
-                checkbox_item.setCheckState(Qt.Checked)
-                if row < len(self.filtered_data):
-                    data_row = self.filtered_data[row]
-                    for idx, imported_row in enumerate(self.imported_data):
-                        if len(imported_row) == len(data_row) and all(str(a) == str(b) for a, b in zip(imported_row, data_row)):
-                            self.selected_rows.add(idx)
-                            break
-        self.data_table.itemChanged.connect(self.on_checkbox_changed)
+        self.duplicates_btn.setChecked(False)
+        self.invalid_btn.setChecked(False)
+        for widget in filter_widgets:
+            widget.blockSignals(False)
+        self.filtered_data = self.imported_data.view()
+        self.show_filtered_data()
+    def duplicate_index(self):
+        """Duplicate-address index of the recipient email column, or None without one"""
+        email_column = find_email_column(self.headers)
+        if email_column < 0 or not self.imported_data or email_column >= len(self.imported_data.columns):
+            return None
+        return self.imported_data.duplicate_index(email_column)
+    def address_checks(self):
+        """Validation verdicts of the recipient email column, or None without one"""
+        email_column = find_email_column(self.headers)
+        if email_column < 0 or not self.imported_data or email_column >= len(self.imported_data.columns):
+            return None
+        return self.imported_data.address_checks(email_column)
+    def update_recipient_tools(self):
+        """Enable the duplicate and address tools and summarize a newly loaded dataset"""
+        duplicate_index = self.duplicate_index()
+        address_checks = self.address_checks()
+        has_duplicates = duplicate_index is not None and duplicate_index.duplicate_group_count > 0
+        has_invalid = address_checks is not None and address_checks.invalid_row_count > 0
+        for button, enabled in ((self.duplicates_btn, has_duplicates), (self.invalid_btn, has_invalid)):
+            button.blockSignals(True)
+            button.setChecked(False)
+            button.blockSignals(False)
+            button.setEnabled(enabled)
+        self.dedupe_btn.setEnabled(has_duplicates)
+        self.data_table_model.set_address_checks(address_checks)
+        if duplicate_index is None:
+            self.recipient_info_label.setText("No email column found" if self.headers else "")
+            return
+        if has_duplicates:
+            groups = duplicate_index.duplicate_group_count
+            info_text = (f"{groups:,} {'address appears' if groups == 1 else 'addresses appear'} more than once "
+                         f"({duplicate_index.duplicate_row_count:,} rows)")
+        else:
+            info_text = "No duplicate addresses"
+        if has_invalid:
+            info_text += f" | {address_checks.invalid_row_count:,} rows need attention: {address_checks.summary()}"
+        else:
+            info_text += " | All addresses look valid"
+        self.recipient_info_label.setText(info_text)
+    def uncheck_duplicates(self):
+        """Uncheck every checked row whose address is already checked in another row"""
+        duplicate_index = self.duplicate_index()
+        if duplicate_index is None:
+            return
+        choices = {"Keep the first occurrence": DEDUPE_KEEP[0], "Keep the last occurrence": DEDUPE_KEEP[1]}
+        label, ok = QInputDialog.getItem(
+            self, "Uncheck Duplicates", "Several checked rows share an email address.\nWhich row should stay checked?",
+            list(choices), 0, False
+        )
+        if not ok:
+            return
+        redundant = duplicate_index.redundant_rows(self.selected_rows.row_ids(), choices[label])
+        self.selected_rows.deselect(redundant)
+        self.statusBar().showMessage(f"Unchecked {len(redundant):,} duplicate rows")
+    def on_selection_changed(self):
+        """selected_rows changed - once per checkbox click or bulk operation"""
+        self.data_table_model.refresh_check_states()
         self.update_selection_info()
         if hasattr(self, 'format_preview'):
             self.update_format_preview()
+    def select_all_rows(self):
+        self.selected_rows.select(self.filtered_data.row_ids)
     def deselect_all_rows(self):
-        try:
-            self.data_table.itemChanged.disconnect(self.on_checkbox_changed)
-        except:
-            pass
-        for row in range(self.data_table.rowCount()):
-            checkbox_item = self.data_table.item(row, 0)
-            if checkbox_item:
-                checkbox_item.setCheckState(Qt.Unchecked)
-        self.selected_rows.clear()
-        self.data_table.itemChanged.connect(self.on_checkbox_changed)
-        self.update_selection_info()
-        if hasattr(self, 'format_preview'):
-            self.update_format_preview()
+        self.selected_rows.deselect(self.filtered_data.row_ids)
+    def invert_selection(self):
+        self.selected_rows.invert(self.filtered_data.row_ids)
     def load_default_template(self):
         """Method kept for backwards compatibility but does nothing.
         Users must load template from file using the Load button."""
@@ -1740,7 +2454,7 @@ class UniversalSender(QMainWindow):
             if not hasattr(self, 'template_editor'):
                 return
             template_text = self.template_editor.toPlainText()
-            self.placeholders = PlaceholderExtractor.extract_placeholders(template_text)
+            self.placeholders = PlaceholderExtractor.extract_placeholders(template_text, self.headers)
             if hasattr(self, 'placeholders_label'):
                 if self.placeholders:
                     placeholder_text = f"Detected placeholders: {', '.join(self.placeholders)}"
@@ -1772,7 +2486,13 @@ class UniversalSender(QMainWindow):
         if not hasattr(self, 'mapping_table'):
             return
         self.mapping_table.setRowCount(len(self.placeholders))
-        suggestions = PlaceholderExtractor.suggest_mappings(self.placeholders, self.headers)
+        if self.column_matcher is None or self.column_matcher.headers != self.headers:
+            self.column_matcher = ColumnMatcher(self.headers, self.mapping_memory)
+        suggestions = self.column_matcher.suggest(self.placeholders)
+        # A column picked by hand survives rebuilding the table ('' when "-- Select Column --" was picked)
+        for placeholder, header in self.confirmed_mappings.items():
+            if not header or header in self.headers:
+                suggestions[placeholder] = header
         for row, placeholder in enumerate(self.placeholders):
             placeholder_item = QTableWidgetItem(placeholder)
             placeholder_item.setFlags(Qt.ItemIsEnabled)
@@ -1796,6 +2516,11 @@ class UniversalSender(QMainWindow):
                     min-height: 20px;
                 }}""")
             column_combo.currentTextChanged.connect(self.update_send_summary)
+            column_combo.activated.connect(
+                lambda index, placeholder=placeholder: self.confirm_mapping(placeholder, self.headers[index - 1] if index > 0 else ''))
+            ranked = self.column_matcher.rank(placeholder, 3)
+            if ranked:
+                column_combo.setToolTip("Best matches: " + ", ".join(f"{header} ({score:.0%})" for header, score in ranked))
             if placeholder in suggestions:
                 suggested_column = suggestions[placeholder]
                 if suggested_column in self.headers:
@@ -1805,8 +2530,8 @@ class UniversalSender(QMainWindow):
             sample_data = ""
             if placeholder in suggestions and suggestions[placeholder] in self.headers:
                 col_index = self.headers.index(suggestions[placeholder])
-                if self.imported_data and col_index < len(self.imported_data[0]):
-                    sample_data = str(self.imported_data[0][col_index])[:50]
+                if self.imported_data:
+                    sample_data = self.imported_data.display_value(0, col_index)[:50]
             sample_item = QTableWidgetItem(sample_data)
             sample_item.setFlags(Qt.ItemIsEnabled)
             self.mapping_table.setItem(row, 2, sample_item)
@@ -1814,6 +2539,9 @@ class UniversalSender(QMainWindow):
         self.mapping_table.setColumnWidth(1, 280)  
         self.mapping_table.setColumnWidth(2, 650)  
         self.mapping_table.resizeRowsToContents()
+    def confirm_mapping(self, placeholder: str, header: str):
+        """Record a column the user picked for placeholder; only these change what is sent and are learned"""
+        self.confirmed_mappings[placeholder] = header
     def on_account_changed(self, index):
         """Log when user changes the selected account"""
         if index >= 0 and index < len(self.email_accounts_list):
@@ -1821,41 +2549,49 @@ class UniversalSender(QMainWindow):
             logger.info(f"\n>>> USER SELECTED: Index[{index}] = {selected_email} <<<\n")
             if hasattr(self, 'log_display'):
                 self.log_display.append(f"Selected sender: {selected_email}")
-    def load_email_accounts(self):
-        """Load email accounts from Outlook - handles lazy-loaded UI elements"""
+    def refresh_email_accounts(self):
+        """Discover Outlook accounts on a worker thread; the combo is filled when it finishes"""
         if not hasattr(self, 'account_combo'):
             logger.warning("Account combo not loaded yet, skipping email account loading")
             return
+        if self.account_worker is not None:
+            return
         self.account_combo.clear()
-        self.email_accounts_list.clear()
-        self.account_combo.addItem("No Outlook Integration Available")
+        self.account_combo.addItem("Loading Outlook accounts...")
+        self.account_combo.setEnabled(False)
         self.email_accounts = []
         self.email_accounts_list = []
-        try:
-            detected_accounts = EmailSender.get_email_accounts()
+        self.update_send_summary()
+        self.account_worker = AccountDiscoveryWorker(self.outlook_factory, self)
+        self.account_worker.accounts_ready.connect(self.on_accounts_loaded)
+        self.account_worker.start()
+    def on_accounts_loaded(self, result):
+        self.account_worker.wait()
+        self.account_worker = None
+        self.email_accounts_loaded = True
+        self.account_combo.setEnabled(True)
+        self.load_email_accounts(result['accounts'])
+        if not result['success']:
             self.account_combo.clear()
-            self.email_accounts_list = detected_accounts.copy()  
-            self.email_accounts = detected_accounts  
-            if self.email_accounts_list:
-                logger.info(f"\n{'='*60}")
-                logger.info(f"DROPDOWN MENU ACCOUNT MAPPING:")
-                for index, account in enumerate(self.email_accounts_list):
-                    account_display = f"{account['email']} (Account {index + 1})"
-                    self.account_combo.addItem(account_display)
-                    self.account_combo.setItemData(index, account['email'])
-                    logger.info(f"  Dropdown Index[{index}] → {account['email']}")
-                logger.info(f"{'='*60}\n")
-            else:
-                self.account_combo.addItem("No email accounts found")
-                self.email_accounts_list = []
-                self.email_accounts = []
-        except Exception as e:
-            logger.error(f"Error loading email accounts: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
-            self.account_combo.addItem("Error loading accounts")
-            self.email_accounts_list = []
-            self.email_accounts = []
+            self.account_combo.addItem("Error loading accounts" if result['title'] != "No Accounts" else "No email accounts found")
+            self.statusBar().showMessage("Could not load Outlook accounts")
+            QMessageBox.warning(self, result['title'], result['message'])
+    def load_email_accounts(self, detected_accounts: List[Dict[str, Any]]):
+        """Fill the account combo from the discovered accounts"""
+        self.account_combo.clear()
+        self.email_accounts_list = list(detected_accounts)
+        self.email_accounts = detected_accounts
+        if self.email_accounts_list:
+            logger.info(f"\n{'='*60}")
+            logger.info(f"DROPDOWN MENU ACCOUNT MAPPING:")
+            for index, account in enumerate(self.email_accounts_list):
+                account_display = f"{account['email']} (Account {index + 1})"
+                self.account_combo.addItem(account_display)
+                self.account_combo.setItemData(index, account['email'])
+                logger.info(f"  Dropdown Index[{index}] → {account['email']}")
+            logger.info(f"{'='*60}\n")
+        else:
+            self.account_combo.addItem("No email accounts found")
         self.update_send_summary()
     def update_send_summary(self, *args):
         if not self.imported_data:
@@ -1927,34 +2663,42 @@ class UniversalSender(QMainWindow):
                     if combo and combo.currentIndex() > 0:
                         column_name = combo.currentText()
                         if column_name in self.headers:
-                            col_index = self.headers.index(column_name)
-                            mappings[placeholder] = col_index
+                            mappings[placeholder] = column_name
             except Exception as e:
                 logger.error(f"Error building mappings: {e}")
                 QMessageBox.critical(self, "Mapping Error", f"Error processing column mappings: {str(e)}")
                 return
-            try:
-                recipients = []
-                for row_index in sorted(self.selected_rows):
-                    if row_index < len(self.imported_data):
-                        row_data = self.imported_data[row_index]
-                        recipient = {}
-                        for header_index, header in enumerate(self.headers):
-                            if header_index < len(row_data):
-                                recipient[header] = row_data[header_index]
-                        recipients.append(recipient)
-                if not recipients:
-                    QMessageBox.warning(self, "No Valid Recipients", 
-                                      "No valid recipients found in selected rows.")
-                    return
-            except Exception as e:
-                logger.error(f"Error building recipients: {e}")
-                QMessageBox.critical(self, "Recipients Error", f"Error processing recipients: {str(e)}")
+            send_rows = self.selected_rows.row_ids()
+            skip_duplicates = True
+            duplicate_index = self.duplicate_index()
+            if duplicate_index is not None:
+                redundant = duplicate_index.redundant_rows(send_rows)
+                if len(redundant):
+                    reply = QMessageBox.question(
+                        self, "Duplicate Recipients",
+                        f"{len(redundant)} of the selected rows repeat an email address that is already selected.\n\n"
+                        "Skip them and send each address only once?",
+                        QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+                    )
+                    if reply == QMessageBox.Cancel:
+                        return
+                    if reply == QMessageBox.Yes:
+                        send_rows = np.setdiff1d(send_rows, redundant, assume_unique=True)
+                    else:
+                        skip_duplicates = False
+            send_rows = send_rows[send_rows < len(self.imported_data)]
+            if not len(send_rows):
+                QMessageBox.warning(self, "No Valid Recipients", 
+                                  "No valid recipients found in selected rows.")
                 return
+            address_checks = self.address_checks()
+            flagged_count = len(address_checks.invalid_rows(send_rows)) if address_checks is not None else 0
             reply = QMessageBox.question(
                 self, "Confirm Sending",
-                f"Send emails to {len(recipients)} recipients?" + 
-                (f"\nAttachments: {len(self.attachments)} files" if self.attachments else ""),
+                f"Send emails to {len(send_rows)} recipients?" + 
+                (f"\nAttachments: {len(self.attachments)} files" if self.attachments else "") +
+                (f"\n\n{flagged_count} of them have a flagged address (Show Invalid Addresses on the Import Data tab)"
+                 if flagged_count else ""),
                 QMessageBox.Yes | QMessageBox.No
             )
             if reply != QMessageBox.Yes:
@@ -1973,33 +2717,24 @@ class UniversalSender(QMainWindow):
             self.send_btn.setEnabled(False)
             QApplication.processEvents()
             try:
-                processed_recipients = []
-                for recipient in recipients:
-                    email_body = template
-                    email_subject = subject
-                    for header in self.headers:
-                        placeholders = [
-                            f"{{{header.upper()}}}",
-                            f"{{{header}}}",
-                            f"<{header.upper()}>",
-                            f"<{header}>"
-                        ]
-                        if header in recipient:
-                            data = str(recipient[header]) if recipient[header] is not None else ""
-                            if header in self.template_formatting:
-                                data = self.format_column_data(data, header)
-                            for placeholder in placeholders:
-                                email_body = email_body.replace(placeholder, data)
-                                email_subject = email_subject.replace(placeholder, data)
-                    processed_recipient = recipient.copy()
-                    processed_recipient['_processed_template'] = email_body
-                    processed_recipient['_processed_subject'] = email_subject
-                    processed_recipients.append(processed_recipient)
-                logger.info(f"Sending {len(processed_recipients)} emails from: {sender_email}")
+                # Only mappings the user picked change what is sent; untouched suggestions are a preview
+                confirmed = {placeholder: header for placeholder, header in mappings.items()
+                             if self.confirmed_mappings.get(placeholder) == header}
+                aliases = {placeholder.strip('{}'): self.headers.index(header) for placeholder, header in confirmed.items()}
+                subject_template, body_template, used_columns = compile_message(subject, template, self.headers, aliases)
+                self.format_cache.reset_stats()
+                recipients = RecipientStream(send_rows, lambda row_ids: self.render_recipients(
+                    row_ids, subject_template, body_template, used_columns))
+                logger.info(f"Sending {len(recipients)} emails from: {sender_email}")
                 result = EmailSender.send_emails(
-                    processed_recipients, subject, template,  
-                    selected_account, self.attachments
+                    recipients, subject, template,  
+                    selected_account, self.attachments, skip_duplicates
                 )
+                if result.get('sent'):
+                    self.mapping_memory.remember(confirmed)
+                if self.format_cache.hits or self.format_cache.misses:
+                    logger.info(f"Formatting cache: {self.format_cache.summary()}")
+                    self.log_display.append(f"Formatting: {self.format_cache.summary()}")
                 self.progress_bar.setVisible(False)
                 self.send_btn.setEnabled(True)
                 if result['success']:
@@ -2094,6 +2829,16 @@ class UniversalSender(QMainWindow):
     def closeEvent(self, event):
         """Handle window close event"""
         logger.info("Application closing...")
+        if self.import_worker is not None:
+            self.import_worker.cancel()
+            self.import_worker.wait()
+        self.cancel_filter()
+        if self.filter_worker is not None:
+            self.filter_worker.wait()
+        if self.account_worker is not None:
+            self.account_worker.wait()
+        if self.table_list_worker is not None:
+            self.table_list_worker.wait()
         event.accept()
     def apply_dark_titlebar(self):
         """Apply dark theme to Windows title bar using DWM API"""
@@ -1,6 +1,11 @@
 import sys
 import os
 import logging
+import multiprocessing
+if __name__ == "__main__":
+    # Worker processes of the multi-file import pool start here in the frozen executable;
+    # hand them over before the log file is reopened and Qt is set up
+    multiprocessing.freeze_support()
 if hasattr(sys, 'frozen'):
     log_dir = os.path.join(os.path.expanduser('~'), 'EmailSender_Logs')
     os.makedirs(log_dir, exist_ok=True)
@@ -0,0 +1,173 @@
+import re
+from typing import Sequence
+import numpy as np
+RECIPIENT_EMAIL_HEADERS = ('EMAIL', 'Email', 'email', 'E-mail', 'E-Mail', 'Mail', 'MAIL')
+DEDUPE_KEEP = ('first', 'last')
+ADDRESS_VALID = 0
+ADDRESS_EMPTY = 1
+ADDRESS_WHITESPACE = 2
+ADDRESS_SYNTAX = 3
+ADDRESS_TYPO = 4
+ADDRESS_ISSUES = {
+    ADDRESS_EMPTY: "Empty address",
+    ADDRESS_WHITESPACE: "Leading or trailing whitespace",
+    ADDRESS_SYNTAX: "Invalid address syntax",
+    ADDRESS_TYPO: "Possible typo in domain"
+}
+# Dot-atom local part; dot-separated domain labels ending in an alphabetic TLD
+_LOCAL_PART_PATTERN = re.compile(r"[\w!#$%&'*+/=?^`{|}~-]+(?:\.[\w!#$%&'*+/=?^`{|}~-]+)*\Z")
+_DOMAIN_PATTERN = re.compile(r"(?:[^\W_](?:(?:[^\W_]|-)*[^\W_])?\.)+[^\W\d_]{2,63}\Z")
+_TYPO_TLD_PATTERN = re.compile(r"\.(?:con|cmo|ocm|comm|cim|vom|xom|c0m|nte|nett|ogr|orgg)\Z")
+_TYPO_DOMAINS = {
+    'gmial.com': 'gmail.com', 'gmai.com': 'gmail.com', 'gamil.com': 'gmail.com', 'gnail.com': 'gmail.com',
+    'gmaill.com': 'gmail.com', 'gmail.co': 'gmail.com', 'gmail.cm': 'gmail.com', 'googlemail.co': 'googlemail.com',
+    'hotmial.com': 'hotmail.com', 'hotmai.com': 'hotmail.com', 'hotmil.com': 'hotmail.com', 'hotmail.co': 'hotmail.com',
+    'yaho.com': 'yahoo.com', 'yahooo.com': 'yahoo.com', 'yahoo.co': 'yahoo.com',
+    'outlok.com': 'outlook.com', 'outloo.com': 'outlook.com', 'outlook.co': 'outlook.com',
+    'iclod.com': 'icloud.com', 'icloud.co': 'icloud.com'
+}
+_TYPO_TLDS = {'con': 'com', 'cmo': 'com', 'ocm': 'com', 'comm': 'com', 'cim': 'com', 'vom': 'com', 'xom': 'com',
+              'c0m': 'com', 'nte': 'net', 'nett': 'net', 'ogr': 'org', 'orgg': 'org'}
+def find_email_column(headers: Sequence) -> int:
+    """Index of the column EmailSender.send_emails takes the address from, or -1 if there is none"""
+    headers = list(headers)
+    for name in RECIPIENT_EMAIL_HEADERS:
+        if name in headers:
+            return headers.index(name)
+    return -1
+def normalize_email(address) -> str:
+    """Key under which two spellings of the same address compare equal: trimmed and lower-cased"""
+    return str(address).strip().lower() if address is not None else ''
+class AddressValidator:
+    """Syntax, whitespace and typo-domain verdicts for email addresses.
+    The local part is matched with a precompiled pattern. The domain verdict is cached per
+    distinct domain, since a recipient list usually shares a handful of domains."""
+    def __init__(self):
+        self._domains = {}
+    def check_domain(self, domain: str) -> int:
+        verdict = self._domains.get(domain)
+        if verdict is None:
+            folded = domain.lower()
+            if not _DOMAIN_PATTERN.match(domain):
+                verdict = ADDRESS_SYNTAX
+            elif folded in _TYPO_DOMAINS or _TYPO_TLD_PATTERN.search(folded):
+                verdict = ADDRESS_TYPO
+            else:
+                verdict = ADDRESS_VALID
+            self._domains[domain] = verdict
+        return verdict
+    def check(self, text: str) -> int:
+        """Verdict for one display string of the email column: ADDRESS_VALID or a key of ADDRESS_ISSUES"""
+        address = text.strip()
+        if not address:
+            return ADDRESS_EMPTY
+        local, at, domain = address.rpartition('@')
+        if not at or not _LOCAL_PART_PATTERN.match(local):
+            return ADDRESS_SYNTAX
+        verdict = self.check_domain(domain)
+        if verdict == ADDRESS_VALID and len(address) != len(text):
+            return ADDRESS_WHITESPACE
+        return verdict
+def suggest_domain(address: str) -> str:
+    """Likely intended domain for an address with an ADDRESS_TYPO verdict, or '' if unknown"""
+    domain = address.strip().rpartition('@')[2].lower()
+    if domain in _TYPO_DOMAINS:
+        return _TYPO_DOMAINS[domain]
+    name, _, tld = domain.rpartition('.')
+    return f"{name}.{_TYPO_TLDS[tld]}" if tld in _TYPO_TLDS else ''
+class DuplicateIndex:
+    """Hash index from normalized recipient address to the rows holding it.
+    Every distinct value of the email column is normalized and looked up in a dict once,
+    which gives it a group id; the ids are spread to the rows through the column codes.
+    Building the index is one pass over the distinct values plus a few vectorized passes
+    over the rows - no pairwise comparison. Blank cells (None, NaN, whitespace) get group -1
+    and never count as duplicates of each other."""
+    def __init__(self, dataset, column_index: int):
+        self.column_index = column_index
+        self.column = dataset.columns[column_index]
+        self.row_count = len(dataset)
+        groups = {}
+        display = self.column.display_values()
+        blank = self.column.blank_values().tolist()
+        value_groups = np.fromiter(
+            (-1 if is_blank else groups.setdefault(text.strip().lower(), len(groups)) for text, is_blank in zip(display, blank)),
+            dtype=np.int64, count=len(display))
+        self.addresses = list(groups)
+        self.row_groups = self.column.expand(value_groups) if self.row_count else np.zeros(0, dtype=np.int64)
+        self.counts = np.bincount(self.row_groups[self.row_groups >= 0], minlength=len(groups))
+        # Group -1 picks the appended 0, so blank rows are never duplicates
+        self.duplicate_mask = np.append(self.counts, 0)[self.row_groups] > 1
+        self.duplicate_group_count = int((self.counts > 1).sum())
+        self.duplicate_row_count = int(self.duplicate_mask.sum())
+    def is_current(self, dataset) -> bool:
+        """Whether the index still describes dataset (no rows appended, column not re-encoded)"""
+        return (self.row_count == len(dataset) and self.column_index < len(dataset.columns)
+                and dataset.columns[self.column_index] is self.column)
+    def address_count(self, row_id: int) -> int:
+        """How many rows hold the address of row_id (0 for a blank cell)"""
+        group = int(self.row_groups[row_id])
+        return int(self.counts[group]) if group >= 0 else 0
+    def duplicate_rows(self, row_ids=None) -> np.ndarray:
+        """Row ids (of row_ids, or of all rows) whose address occurs more than once in the column,
+        grouped by address; groups come in order of first appearance, rows keep the given order"""
+        row_ids = np.arange(self.row_count, dtype=np.int64) if row_ids is None else np.asarray(row_ids, dtype=np.int64)
+        row_ids = row_ids[self.duplicate_mask[row_ids]]
+        return row_ids[np.argsort(self.row_groups[row_ids], kind='stable')]
+    def redundant_rows(self, row_ids, keep: str = 'first') -> np.ndarray:
+        """Ascending row ids of row_ids that repeat an address held by another of row_ids:
+        every row of an address except the first (keep='first') or last (keep='last') in row_ids order"""
+        if keep not in DEDUPE_KEEP:
+            raise ValueError(f"keep must be one of {DEDUPE_KEEP}, not {keep!r}")
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if not len(row_ids):
+            return row_ids
+        groups = self.row_groups[row_ids]
+        order = np.argsort(groups, kind='stable')
+        groups = groups[order]
+        same = groups[1:] == groups[:-1]
+        repeat = np.r_[False, same] if keep == 'first' else np.r_[same, False]
+        return np.sort(row_ids[order[repeat & (groups >= 0)]])
+class AddressChecks:
+    """Validation verdict for the address of every row of the email column.
+    An AddressValidator checks each distinct value once and the verdicts
+    are spread to the rows through the column codes, like DuplicateIndex does with group ids,
+    so a repeated address is checked only once however many rows hold it."""
+    def __init__(self, dataset, column_index: int):
+        self.column_index = column_index
+        self.column = dataset.columns[column_index]
+        self.row_count = len(dataset)
+        display = self.column.display_values()
+        check = AddressValidator().check
+        # Empty cells are classified from the raw value: a NaN cell displays as 'nan'
+        blank = self.column.blank_values().tolist()
+        self.value_verdicts = np.fromiter((ADDRESS_EMPTY if is_blank else check(text) for text, is_blank in zip(display, blank)),
+                                          dtype=np.int8, count=len(display))
+        self.row_verdicts = self.column.expand(self.value_verdicts) if self.row_count else np.zeros(0, dtype=np.int8)
+        self.issue_counts = np.bincount(self.row_verdicts, minlength=max(ADDRESS_ISSUES) + 1)
+        self.invalid_row_count = int(self.row_count - self.issue_counts[ADDRESS_VALID])
+    def is_current(self, dataset) -> bool:
+        """Whether the verdicts still describe dataset (no rows appended, column not re-encoded)"""
+        return (self.row_count == len(dataset) and self.column_index < len(dataset.columns)
+                and dataset.columns[self.column_index] is self.column)
+    def verdict(self, row_id: int) -> int:
+        return int(self.row_verdicts[row_id])
+    def describe(self, row_id: int) -> str:
+        """Issue found in the address of row_id, with a suggested domain for typos; '' if valid"""
+        verdict = self.verdict(row_id)
+        if verdict == ADDRESS_VALID:
+            return ''
+        if verdict == ADDRESS_TYPO:
+            suggestion = suggest_domain(self.column.display(row_id))
+            if suggestion:
+                return f"{ADDRESS_ISSUES[verdict]} - did you mean {suggestion}?"
+        return ADDRESS_ISSUES[verdict]
+    def invalid_rows(self, row_ids=None) -> np.ndarray:
+        """Row ids (of row_ids, or of all rows) whose address has an issue, in the given order"""
+        if row_ids is None:
+            return np.flatnonzero(self.row_verdicts != ADDRESS_VALID).astype(np.int64)
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        return row_ids[self.row_verdicts[row_ids] != ADDRESS_VALID]
+    def summary(self) -> str:
+        """Rows per issue on one line, e.g. 'Invalid address syntax: 12, Empty address: 3'"""
+        return ', '.join(f"{label}: {int(self.issue_counts[verdict]):,}"
+                         for verdict, label in ADDRESS_ISSUES.items() if self.issue_counts[verdict])
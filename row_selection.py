@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+class RowSelection(QObject):
+    """Set of checked dataset row ids stored as a packed bitmap, one bit per row.
+    Membership tests and single-row toggles are O(1); select, deselect and invert take an
+    array of row ids (usually a filtered view) and apply it to the whole bitmap with one
+    vectorized operation. Every change emits changed once - bulk operations included, and
+    any number of changes made inside batch() are coalesced into a single notification.
+    Iteration yields the selected row ids in ascending order, so it can stand in for the
+    set of ints it replaces."""
+    changed = pyqtSignal()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._bits = np.zeros(0, dtype=np.uint8)
+        self._count = 0
+        self._batch_depth = 0
+        self._dirty = False
+    def _ensure_capacity(self, row_count: int):
+        needed = (row_count + 7) >> 3
+        if needed > len(self._bits):
+            bits = np.zeros(max(needed, 2 * len(self._bits)), dtype=np.uint8)
+            bits[:len(self._bits)] = self._bits
+            self._bits = bits
+    def _mask(self, row_ids) -> np.ndarray:
+        """Packed bitmap with the bits of row_ids set, sized like self._bits"""
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if len(row_ids):
+            self._ensure_capacity(int(row_ids.max()) + 1)
+        flags = np.zeros(len(self._bits) * 8, dtype=bool)
+        flags[row_ids] = True
+        return np.packbits(flags, bitorder='little')
+    def _notify(self):
+        if self._batch_depth:
+            self._dirty = True
+        else:
+            self.changed.emit()
+    def _recount(self):
+        self._count = int(_POPCOUNT[self._bits].sum(dtype=np.int64))
+        self._notify()
+    @contextmanager
+    def batch(self):
+        """Hold back change notifications until the block ends, then emit at most one"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._dirty = False
+                self.changed.emit()
+    def __len__(self) -> int:
+        return self._count
+    def __bool__(self) -> bool:
+        return self._count > 0
+    def __contains__(self, row_id) -> bool:
+        byte = row_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] >> (row_id & 7) & 1)
+    def __iter__(self):
+        return iter(self.row_ids().tolist())
+    def row_ids(self) -> np.ndarray:
+        """Selected row ids in ascending order"""
+        return np.flatnonzero(np.unpackbits(self._bits, bitorder='little'))
+    def first(self) -> int:
+        """Lowest selected row id, or -1 when nothing is selected"""
+        nonzero = np.flatnonzero(self._bits)
+        if not len(nonzero):
+            return -1
+        byte = int(nonzero[0])
+        value = int(self._bits[byte])
+        return byte * 8 + (value & -value).bit_length() - 1
+    def add(self, row_id: int):
+        if row_id in self:
+            return
+        self._ensure_capacity(row_id + 1)
+        self._bits[row_id >> 3] |= np.uint8(1 << (row_id & 7))
+        self._count += 1
+        self._notify()
+    def discard(self, row_id: int):
+        if row_id not in self:
+            return
+        self._bits[row_id >> 3] &= np.uint8(~(1 << (row_id & 7)) & 0xFF)
+        self._count -= 1
+        self._notify()
+    def select(self, row_ids):
+        """Add every row id in row_ids"""
+        mask = self._mask(row_ids)
+        self._bits |= mask
+        self._recount()
+    def deselect(self, row_ids):
+        """Remove every row id in row_ids"""
+        mask = self._mask(row_ids)
+        self._bits &= ~mask
+        self._recount()
+    def invert(self, row_ids):
+        """Flip the state of every row id in row_ids; the ids must be unique"""
+        mask = self._mask(row_ids)
+        self._bits ^= mask
+        self._recount()
+    def clear(self):
+        if not self._count:
+            return
+        self._bits[:] = 0
+        self._count = 0
+        self._notify()
@@ -0,0 +1,146 @@
+from typing import List, Optional, Callable
+import numpy as np
+MIN_GRAM = 3
+STOP_GRAM_RATIO = 0.25
+STOP_GRAM_MIN_VALUES = 1000
+_SEPARATOR = '\x00'
+class SearchCancelled(Exception):
+    """Raised when the cancelled callback of a search reports that its result is no longer wanted"""
+def _encode(text: str) -> bytes:
+    """One 32-bit code point per character, lone surrogates included"""
+    return text.encode('utf-32-le', errors='surrogatepass')
+class TrigramIndex:
+    """Trigram posting lists over the distinct (lower-cased) values of one column.
+    Every trigram maps to the sorted indices of the values that contain it, so the values
+    that may contain a needle are the intersection of the posting lists of its trigrams.
+    Trigrams found in more than STOP_GRAM_RATIO of a large column (".co", "com", "@ex")
+    narrow nothing down; they are remembered as present but get no posting list.
+    The index is built with numpy from the concatenated values in one pass."""
+    def __init__(self, values: List[str]):
+        self.value_count = len(values)
+        self.alphabet = np.zeros(0, dtype=np.uint32)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.stop_keys = np.zeros(0, dtype=np.int64)
+        if values:
+            self._build(values)
+    def _build(self, values: List[str]):
+        codes = np.frombuffer(_encode(_SEPARATOR.join(values) + _SEPARATOR), dtype=np.uint32)
+        present = np.zeros(int(codes.max()) + 1, dtype=bool)
+        present[codes] = True
+        self.alphabet = np.flatnonzero(present).astype(np.uint32)
+        # The separator is the lowest code point, so it becomes dense code 0
+        dense = (np.cumsum(present) - 1).astype(np.int32)[codes]
+        del codes, present
+        size = len(self.alphabet)
+        lengths = np.fromiter(map(len, values), dtype=np.int32, count=len(values))
+        starts = np.flatnonzero((dense[:-2] != 0) & (dense[1:-1] != 0) & (dense[2:] != 0))
+        if not len(starts):
+            return
+        value_ids = np.repeat(np.arange(len(values), dtype=np.int32), lengths + 1)[starts].astype(np.int64)
+        keys = (dense[starts].astype(np.int64) * size + dense[starts + 1]) * size + dense[starts + 2]
+        del dense, starts
+        if size ** 3 * len(values) < 2 ** 62:
+            # One sort of a combined key orders by trigram, then by value
+            combined = keys * len(values) + value_ids
+            combined.sort()
+            combined = combined[np.r_[True, combined[1:] != combined[:-1]]]
+            keys, value_ids = combined // len(values), combined % len(values)
+        else:
+            order = np.lexsort((value_ids, keys))
+            keys, value_ids = keys[order], value_ids[order]
+            keep = np.r_[True, (keys[1:] != keys[:-1]) | (value_ids[1:] != value_ids[:-1])]
+            keys, value_ids = keys[keep], value_ids[keep]
+        boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        counts = np.diff(np.r_[boundaries, len(keys)])
+        stop = counts > STOP_GRAM_RATIO * len(values) if len(values) >= STOP_GRAM_MIN_VALUES else np.zeros(len(counts), dtype=bool)
+        self.stop_keys = keys[boundaries[stop]]
+        keep = np.repeat(~stop, counts)
+        self.keys = keys[boundaries[~stop]]
+        self.offsets = np.r_[0, np.cumsum(counts[~stop])].astype(np.int64)
+        self.postings = value_ids[keep].astype(np.int32)
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.alphabet, self.keys, self.offsets, self.postings, self.stop_keys))
+    def candidates(self, needle: str) -> Optional[np.ndarray]:
+        """Sorted indices of the values that contain every trigram of needle.
+        Returns None when the index cannot narrow the search (needle shorter than a trigram,
+        or made only of stop trigrams); the caller then has to test the values itself."""
+        if len(needle) < MIN_GRAM or _SEPARATOR in needle:
+            return None
+        if not len(self.keys) and not len(self.stop_keys):
+            return np.zeros(0, dtype=np.int32)
+        codes = np.frombuffer(_encode(needle), dtype=np.uint32)
+        positions = np.searchsorted(self.alphabet, codes)
+        if (positions >= len(self.alphabet)).any() or (self.alphabet[positions] != codes).any():
+            return np.zeros(0, dtype=np.int32)
+        size = len(self.alphabet)
+        dense = positions.astype(np.int64)
+        keys = set(((dense[:-2] * size + dense[1:-1]) * size + dense[2:]).tolist())
+        postings = []
+        for key in keys:
+            slot = int(np.searchsorted(self.keys, key))
+            if slot < len(self.keys) and self.keys[slot] == key:
+                postings.append(self.postings[self.offsets[slot]:self.offsets[slot + 1]])
+            elif not np.isin(key, self.stop_keys):
+                return np.zeros(0, dtype=np.int32)
+        if not postings:
+            return None
+        postings.sort(key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            result = result[np.isin(result, posting, assume_unique=True)]
+            if not len(result):
+                break
+        return result
+class SearchIndex:
+    """Substring search over every column of a dataset, answered from trigram posting lists.
+    The matches of the last query are kept per column: when the next query contains it
+    (typically the same text with one more character typed), only values that matched
+    before are tested again instead of the whole column."""
+    def __init__(self, dataset):
+        self.columns = list(dataset.columns)
+        self.row_count = len(dataset)
+        self.indexes = [TrigramIndex(column.folded_values()) for column in self.columns]
+        self._previous_needle = None
+        self._previous_matches = None
+    def is_current(self, dataset) -> bool:
+        """Whether the index still describes dataset (no rows appended, no column re-encoded)"""
+        return self.row_count == len(dataset) and len(self.columns) == len(dataset.columns) and all(
+            a is b for a, b in zip(self.columns, dataset.columns))
+    def nbytes(self) -> int:
+        return sum(index.nbytes() for index in self.indexes)
+    def matching_values(self, needle: str, cancelled: Callable[[], bool] = None) -> List[np.ndarray]:
+        """Per column, the sorted indices of the folded values containing needle.
+        cancelled is polled before each column; SearchCancelled is raised once it returns True."""
+        previous_needle, previous = self._previous_needle, self._previous_matches
+        refine = previous is not None and previous_needle in needle
+        matches = []
+        for column_index, (column, index) in enumerate(zip(self.columns, self.indexes)):
+            if cancelled is not None and cancelled():
+                raise SearchCancelled()
+            folded = column.folded_values()
+            indexed = index.candidates(needle)
+            candidates = indexed
+            if refine:
+                narrowed = previous[column_index]
+                candidates = narrowed if indexed is None else narrowed[np.isin(narrowed, indexed, assume_unique=True)]
+            if candidates is None:
+                found = np.fromiter((needle in value for value in folded), dtype=bool, count=len(folded))
+                matches.append(np.flatnonzero(found).astype(np.int32))
+            elif indexed is not None and len(needle) == MIN_GRAM:
+                # A needle that is a single indexed trigram needs no verification
+                matches.append(candidates.astype(np.int32))
+            else:
+                matches.append(np.array([i for i in candidates.tolist() if needle in folded[i]], dtype=np.int32))
+        self._previous_needle, self._previous_matches = needle, matches
+        return matches
+    def row_mask(self, needle: str, cancelled: Callable[[], bool] = None) -> np.ndarray:
+        """Boolean mask over all rows: True where some cell contains needle"""
+        mask = np.zeros(self.row_count, dtype=bool)
+        for column, matches in zip(self.columns, self.matching_values(needle, cancelled)):
+            if len(matches):
+                flags = np.zeros(len(column.folded_values()), dtype=bool)
+                flags[matches] = True
+                mask |= column.expand(flags)
+        return mask
@@ -0,0 +1,196 @@
+import re
+from itertools import repeat
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+PLACEHOLDER_DELIMITERS = {
+    'double_brace': ('{{', '}}'),
+    'brace': ('{', '}'),
+    'double_angle': ('<<', '>>'),
+    'angle': ('<', '>'),
+    'double_bracket': ('[[', ']]'),
+    'bracket': ('[', ']'),
+    'paren': ('(', ')')
+}
+SEND_KINDS = ('brace', 'angle')
+FIELD_KINDS = ('brace', 'angle', 'bracket', 'double_brace', 'double_angle', 'double_bracket')
+_FORBIDDEN_NAME_CHARS = frozenset('{}<>[];')
+_HTML_ATTRIBUTE_CHARS = frozenset('=/"\'!')
+_HTML_TAGS = frozenset((
+    'a', 'abbr', 'b', 'blockquote', 'body', 'br', 'caption', 'center', 'code', 'col', 'div', 'em', 'font', 'h1', 'h2',
+    'h3', 'h4', 'h5', 'h6', 'head', 'hr', 'html', 'i', 'img', 'li', 'meta', 'ol', 'p', 'pre', 's', 'small', 'span',
+    'strong', 'style', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'title', 'tr', 'u', 'ul'))
+def _kind_pattern(kind: str, opening: str, closing: str) -> str:
+    excluded = ''.join(_FORBIDDEN_NAME_CHARS) + '\n()'
+    prefix = ''
+    if kind == 'angle':
+        excluded += ''.join(_HTML_ATTRIBUTE_CHARS)
+        prefix = '(?!(?:' + '|'.join(sorted(_HTML_TAGS)) + ')>)'
+    elif kind == 'paren':
+        excluded += 'a-z'
+    elif kind == 'brace' or kind == 'double_brace':
+        # "Amount (USD)" is a valid header inside braces
+        excluded = excluded.replace('()', '')
+    content = '[^' + re.escape(excluded).replace('a\\-z', 'a-z') + ']+'
+    return f"(?P<{kind}>{re.escape(opening)}{prefix}({content}){re.escape(closing)})"
+# One alternative per kind, doubled delimiters first so {{x}} is not read as {x} in braces.
+# Spans that cannot be placeholders (HTML tags, prose in parentheses) mostly fail here already.
+_KIND_ALTERNATIVES = '|'.join(_kind_pattern(kind, opening, closing) for kind, (opening, closing) in PLACEHOLDER_DELIMITERS.items())
+_PLACEHOLDER_PATTERN = re.compile(r'(?=[{<\[(])(?:' + _KIND_ALTERNATIVES + ')')
+_HEADER_PATTERNS = {}
+def _header_names(headers: Sequence[str]) -> Tuple[str, ...]:
+    """Headers the generic kinds would reject - parentheses, HTML attribute characters or an
+    HTML tag name, as in "Amount (USD)" or "Date/Time" - longest first so none hides a longer one"""
+    names = {str(header).strip() for header in headers}
+    return tuple(sorted((name for name in names if name and _FORBIDDEN_NAME_CHARS.isdisjoint(name) and '\n' not in name
+                         and any(c.isalpha() for c in name)
+                         and (not _HTML_ATTRIBUTE_CHARS.isdisjoint(name) or '(' in name or ')' in name
+                              or name.lower() in _HTML_TAGS)), key=len, reverse=True))
+def _scan_pattern(headers: Sequence[str]):
+    """_PLACEHOLDER_PATTERN, preceded by one alternative per kind matching exactly the headers of
+    _header_names (case-insensitively), so <Amount (USD)> is a placeholder while <a href="..."> stays HTML"""
+    names = _header_names(headers) if headers else ()
+    if not names:
+        return _PLACEHOLDER_PATTERN
+    pattern = _HEADER_PATTERNS.get(names)
+    if pattern is None:
+        alternation = '|'.join(re.escape(name) for name in names)
+        if len(_HEADER_PATTERNS) >= 32:
+            _HEADER_PATTERNS.clear()
+        pattern = _HEADER_PATTERNS[names] = re.compile(r'(?=[{<\[(])(?:' + '|'.join(
+            f"(?P<header_{kind}>(?i:{re.escape(opening)}[ \t]*({alternation})[ \t]*{re.escape(closing)}))"
+            for kind, (opening, closing) in PLACEHOLDER_DELIMITERS.items()) + '|' + _KIND_ALTERNATIVES + ')')
+    return pattern
+class Placeholder:
+    """One placeholder found in a template: its delimiter kind, the name between the
+    delimiters (trimmed, original case) and its [start, end) span in the template"""
+    __slots__ = ('kind', 'name', 'start', 'end')
+    def __init__(self, kind: str, name: str, start: int, end: int):
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.end = end
+    def __repr__(self) -> str:
+        return f"Placeholder({self.kind!r}, {self.name!r}, {self.start}, {self.end})"
+def _is_placeholder(kind: str, content: str) -> bool:
+    """Whether the text between a pair of delimiters names a placeholder"""
+    name = content.strip()
+    if not name or '\n' in content or not any(c.isalpha() for c in name) or not _FORBIDDEN_NAME_CHARS.isdisjoint(name):
+        return False
+    if kind == 'angle':
+        # <p>, <br/> and <a href="..."> are HTML, not placeholders
+        return _HTML_ATTRIBUTE_CHARS.isdisjoint(name) and name not in _HTML_TAGS
+    if kind == 'paren':
+        # (NAME) is a placeholder, (see below) is prose
+        return name == name.upper()
+    return True
+def tokenize(text: str, headers: Sequence[str] = ()) -> List[Placeholder]:
+    """Every placeholder of text in order, from one left-to-right scan over all delimiter kinds.
+    A bracketed span that is not a placeholder (prose in parentheses, an HTML tag) is skipped
+    by one character only, so a placeholder nested inside it is still found. A span naming
+    one of headers is a placeholder whatever characters the name holds."""
+    pattern = _scan_pattern(headers)
+    placeholders = []
+    # A template repeats the same few placeholders, so each distinct one is checked once
+    verdicts = {}
+    position = 0
+    while position is not None:
+        restart, position = position, None
+        for match in pattern.finditer(text, restart):
+            kind = match.lastgroup
+            content = match.group(match.lastindex + 1)
+            if kind.startswith('header_'):
+                placeholders.append(Placeholder(kind[7:], content, match.start(), match.end()))
+                continue
+            name = verdicts.get((kind, content))
+            if name is None:
+                name = verdicts[kind, content] = content.strip() if _is_placeholder(kind, content) else ''
+            if not name:
+                position = match.start() + 1
+                break
+            placeholders.append(Placeholder(kind, name, match.start(), match.end()))
+    return placeholders
+def cell_text(value) -> str:
+    """Text a cell contributes to a message: str(value), or '' for an empty cell"""
+    return str(value) if value is not None else ''
+class CompiledTemplate:
+    """A subject or body parsed once into literal text and slots bound to column indices.
+    The template is tokenized once; every placeholder of an accepted kind whose name is a
+    header (or the header upper-cased; only that with exact_case off) becomes a slot.
+    A row is rendered by dropping its cell text into the slots and joining - no str.replace
+    pass per header, and text coming from a cell is never scanned for placeholders again.
+    A doubled placeholder such as {{NAME}} whose single kind is accepted but doubled kind
+    is not renders as {value}, as the replace passes used to leave it.
+    aliases binds further names (upper-cased) to column indices; a placeholder naming a header
+    always renders that header, so an alias never shadows an exact match."""
+    def __init__(self, text: str, headers: Sequence[str], kinds: Sequence[str] = SEND_KINDS, exact_case: bool = True,
+                 aliases: Dict[str, int] = None):
+        self.text = text
+        self.headers = list(headers)
+        names = {}
+        for column_index, header in enumerate(self.headers):
+            for name in ((header.upper(), header) if exact_case else (header.upper(),)):
+                names.setdefault(name.strip(), column_index)
+        self._parts = []
+        self._slots = []
+        position = 0
+        closing = ''
+        aliases = {name.strip().upper(): column_index for name, column_index in (aliases or {}).items()}
+        for placeholder in tokenize(text, self.headers) if names or aliases else ():
+            column_index = names.get(placeholder.name)
+            if column_index is None and aliases:
+                column_index = aliases.get(placeholder.name.upper())
+            if column_index is None:
+                continue
+            opening = ''
+            if placeholder.kind not in kinds:
+                single = placeholder.kind.replace('double_', '')
+                if single == placeholder.kind or single not in kinds:
+                    continue
+                opening = PLACEHOLDER_DELIMITERS[single][0]
+            self._parts.append(closing + text[position:placeholder.start] + opening)
+            self._slots.append((len(self._parts), column_index))
+            self._parts.append('')
+            closing = PLACEHOLDER_DELIMITERS[single][1] if opening else ''
+            position = placeholder.end
+        self._parts.append(closing + text[position:])
+        self.columns = sorted({column_index for _, column_index in self._slots})
+    def render(self, values: Sequence[str]) -> str:
+        """Fill the slots from values, the cell texts of one row indexed by column"""
+        if not self._slots:
+            return self.text
+        parts = self._parts[:]
+        for position, column_index in self._slots:
+            parts[position] = values[column_index]
+        return ''.join(parts)
+    def render_all(self, column_texts: Dict[int, Sequence[str]], count: int) -> List[str]:
+        """render for count rows at once; column_texts maps each column of the template to its cell
+        texts for those rows. Literals and columns are zipped and joined in C, with no per-row list."""
+        if not self._slots:
+            return [self.text] * count
+        slots = dict(self._slots)
+        pieces = [column_texts[slots[position]] if position in slots else repeat(part)
+                  for position, part in enumerate(self._parts) if part or position in slots]
+        return list(map(''.join, zip(*pieces)))
+def column_texts(dataset, row_ids: np.ndarray, columns: Sequence[int],
+                 formats: Dict[int, Callable[[str], str]] = None) -> Dict[int, List[str]]:
+    """Cell text of the rows row_ids for each of columns, as lists aligned with row_ids.
+    Works on the dictionary codes of each column: every distinct value among the rows is turned
+    into text (and passed through formats[column], if there is one) once, then spread to the rows
+    with one numpy take - no per-row str() or formatting call."""
+    texts = {}
+    for column_index in columns:
+        column = dataset.columns[column_index]
+        distinct, inverse = np.unique(column.codes[row_ids], return_inverse=True)
+        display = column.display_values()
+        distinct_texts = [display[code] for code in distinct.tolist()]
+        format_text = (formats or {}).get(column_index)
+        if format_text is not None:
+            distinct_texts = [format_text(text) for text in distinct_texts]
+        texts[column_index] = np.array(distinct_texts, dtype=object)[inverse.reshape(-1)].tolist()
+    return texts
+def compile_message(subject: str, body: str, headers: Sequence[str],
+                    aliases: Dict[str, int] = None) -> Tuple[CompiledTemplate, CompiledTemplate, List[int]]:
+    """Compile the subject and body of a mail merge; also returns the column indices either one uses"""
+    subject_template = CompiledTemplate(subject, headers, aliases=aliases)
+    body_template = CompiledTemplate(body, headers, aliases=aliases)
+    return subject_template, body_template, sorted(set(subject_template.columns) | set(body_template.columns))
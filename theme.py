@@ -115,7 +115,7 @@ def get_table_style() -> str:
         CSS stylesheet string
     """
     return f"""
-        QTableWidget {{
+        QTableView {{
             background-color: {colors['table_bg']};
             alternate-background-color: {colors['table_alt_bg']};
             color: {colors['text_primary']};
@@ -127,21 +127,21 @@ def get_table_style() -> str:
             font-family: 'Segoe UI', Arial, sans-serif;
             font-size: 9pt;
         }}
-        QTableWidget::item {{
+        QTableView::item {{
             padding: 4px 8px;
             border: none;
             border-right: 1px solid {colors['border_light']};
             border-bottom: 1px solid {colors['border_light']};
             color: {colors['text_primary']};
         }}
-        QTableWidget::item:!selected:!hover {{
+        QTableView::item:!selected:!hover {{
             background-color: {colors['table_bg']};
         }}
-        QTableWidget::item:selected {{
+        QTableView::item:selected {{
             background-color: {colors['selection_bg']};
             color: {colors['selection_text']};
         }}
-        QTableWidget::item:hover {{
+        QTableView::item:hover {{
             background-color: {colors['hover_bg']};
             color: {colors['text_primary']};
         }}
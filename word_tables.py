@@ -0,0 +1,177 @@
+import zipfile
+from typing import List, Dict, Any, Iterator, Tuple
+from xml.parsers import expat
+W_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+DOCUMENT_PART = 'word/document.xml'
+READ_BLOCK_SIZE = 1024 * 1024
+_TBL, _TR, _TC, _P, _R, _T, _TAB, _BR, _CR, _NO_BREAK_HYPHEN, _GRID_SPAN, _GRID_BEFORE, _V_MERGE = range(13)
+_ELEMENTS = {
+    'tbl': _TBL, 'tr': _TR, 'tc': _TC, 'p': _P, 'r': _R, 't': _T, 'tab': _TAB, 'ptab': _TAB,
+    'br': _BR, 'cr': _CR, 'noBreakHyphen': _NO_BREAK_HYPHEN,
+    'gridSpan': _GRID_SPAN, 'gridBefore': _GRID_BEFORE, 'vMerge': _V_MERGE
+}
+def _namespace_prefix(root_attributes: Dict[str, str]) -> str:
+    """Prefix the document root binds to the WordprocessingML namespace ('w:' in practice)"""
+    for name, value in root_attributes.items():
+        if value == W_NAMESPACE and (name == 'xmlns' or name.startswith('xmlns:')):
+            return name[6:] + ':' if name != 'xmlns' else ''
+    return 'w:'
+class WordTableReader:
+    """Streams the tables of a .docx straight from word/document.xml.
+    The part is decompressed block by block into an expat parser whose handlers only
+    track table, cell and paragraph boundaries, so no element tree is ever built.
+    Only top-level tables are read; nested tables are skipped like python-docx does.
+    Cell text matches python-docx cell.text, and merged cells are expanded to one
+    value per grid column - a gridSpan cell repeats its text and a vMerge continuation
+    takes the text of the cell above."""
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._archive = zipfile.ZipFile(file_path)
+        self.size = self._archive.getinfo(DOCUMENT_PART).file_size
+        self.bytes_read = 0
+        self.paragraphs = []
+    def close(self):
+        self._archive.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    def iter_table_rows(self) -> Iterator[Tuple[int, int, List[str]]]:
+        """Yield (table index, row number, cell texts) for every row of every top-level table.
+        Body paragraphs outside tables are collected into self.paragraphs along the way."""
+        self.paragraphs = []
+        self.bytes_read = 0
+        finished_rows = []
+        elements = {}
+        val = 'w:val'
+        type_attribute = 'w:type'
+        table_index = -1
+        table_depth = 0
+        paragraph_depth = 0
+        run_depth = 0
+        row = None
+        row_number = 0
+        previous_row = []
+        cell_paragraphs = None
+        span = 1
+        merge = None
+        parts = None
+        in_text = False
+        def start_root(name, attrs):
+            nonlocal val, type_attribute
+            prefix = _namespace_prefix(attrs)
+            elements.update({prefix + local_name: kind for local_name, kind in _ELEMENTS.items()})
+            val = prefix + 'val'
+            type_attribute = prefix + 'type'
+            parser.StartElementHandler = start_element
+        def start_element(name, attrs):
+            nonlocal table_index, table_depth, paragraph_depth, run_depth, row, row_number, previous_row
+            nonlocal cell_paragraphs, span, merge, parts, in_text
+            kind = elements.get(name)
+            if kind is None:
+                return
+            if kind == _T:
+                in_text = parts is not None and run_depth > 0 and paragraph_depth == 1
+            elif kind == _R:
+                run_depth += 1
+            elif kind == _P:
+                paragraph_depth += 1
+                if paragraph_depth == 1 and (table_depth == 0 or (table_depth == 1 and cell_paragraphs is not None)):
+                    parts = []
+            elif kind == _TC:
+                if table_depth == 1:
+                    cell_paragraphs = []
+                    span = 1
+                    merge = None
+            elif kind == _TR:
+                if table_depth == 1:
+                    row = []
+            elif kind == _TBL:
+                table_depth += 1
+                if table_depth == 1:
+                    table_index += 1
+                    row_number = 0
+                    previous_row = []
+            elif kind < _GRID_SPAN:
+                if parts is not None and run_depth > 0 and paragraph_depth == 1:
+                    if kind == _TAB:
+                        parts.append('\t')
+                    elif kind == _BR:
+                        if attrs.get(type_attribute, 'textWrapping') == 'textWrapping':
+                            parts.append('\n')
+                    elif kind == _CR:
+                        parts.append('\n')
+                    else:
+                        parts.append('-')
+            elif table_depth != 1:
+                return
+            elif kind == _GRID_SPAN:
+                if cell_paragraphs is not None:
+                    span = max(1, int(attrs.get(val, 1)))
+            elif kind == _V_MERGE:
+                if cell_paragraphs is not None:
+                    merge = attrs.get(val, 'continue')
+            elif row is not None and cell_paragraphs is None:
+                row.extend([''] * int(attrs.get(val, 0)))
+        def end_element(name):
+            nonlocal table_depth, paragraph_depth, run_depth, row, row_number, previous_row
+            nonlocal cell_paragraphs, parts, in_text
+            kind = elements.get(name)
+            if kind is None:
+                return
+            if kind == _T:
+                in_text = False
+            elif kind == _R:
+                run_depth -= 1
+            elif kind == _P:
+                paragraph_depth -= 1
+                if paragraph_depth == 0 and parts is not None:
+                    text = ''.join(parts)
+                    parts = None
+                    if table_depth == 0:
+                        self.paragraphs.append(text)
+                    else:
+                        cell_paragraphs.append(text)
+            elif kind == _TBL:
+                table_depth -= 1
+            elif table_depth != 1:
+                return
+            elif kind == _TC:
+                position = len(row)
+                if merge == 'continue' and position < len(previous_row):
+                    row.extend(previous_row[position:position + span])
+                else:
+                    row.extend(['\n'.join(cell_paragraphs)] * span)
+                cell_paragraphs = None
+            elif kind == _TR:
+                finished_rows.append((table_index, row_number, row))
+                previous_row = row
+                row = None
+                row_number += 1
+        def character_data(data):
+            if in_text:
+                parts.append(data)
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start_root
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+        with self._archive.open(DOCUMENT_PART) as handle:
+            while True:
+                block = handle.read(READ_BLOCK_SIZE)
+                self.bytes_read += len(block)
+                parser.Parse(block, not block)
+                if finished_rows:
+                    yield from finished_rows
+                    finished_rows.clear()
+                if not block:
+                    break
+    def tables(self) -> List[Dict[str, Any]]:
+        """Index, header row and number of data rows of every top-level table"""
+        tables = []
+        for table_index, row_number, cells in self.iter_table_rows():
+            if row_number == 0:
+                tables.append({'index': table_index, 'headers': [c.strip() for c in cells], 'rows': 0})
+            else:
+                tables[-1]['rows'] += 1
+        return tables